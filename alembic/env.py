@@ -1,4 +1,4 @@
-from app.models import user
+from app.models import user, template
 from app.database import Base
 from logging.config import fileConfig
 
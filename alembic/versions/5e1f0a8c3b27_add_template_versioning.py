@@ -0,0 +1,32 @@
+"""add template versioning
+
+Revision ID: 5e1f0a8c3b27
+Revises: 9c4e2b7d1a3f
+Create Date: 2026-10-18 11:03:19.552170
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e1f0a8c3b27'
+down_revision: Union[str, None] = '9c4e2b7d1a3f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('templates', sa.Column('updated_at', sa.DateTime(timezone=True),
+                                         server_default=sa.func.now(), nullable=False))
+    op.add_column('templates', sa.Column('revision', sa.Integer(),
+                                         server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('templates', 'revision')
+    op.drop_column('templates', 'updated_at')
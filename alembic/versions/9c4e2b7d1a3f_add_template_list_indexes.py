@@ -0,0 +1,31 @@
+"""add template list indexes
+
+Revision ID: 9c4e2b7d1a3f
+Revises: 73d62fcb29ef
+Create Date: 2026-10-18 10:12:41.218304
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c4e2b7d1a3f'
+down_revision: Union[str, None] = '73d62fcb29ef'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_templates_category_width_height', 'templates',
+                    ['category', 'width', 'height'], unique=False)
+    op.create_index('ix_templates_creator_id', 'templates',
+                    ['creator_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_templates_creator_id', table_name='templates')
+    op.drop_index('ix_templates_category_width_height', table_name='templates')
@@ -0,0 +1,101 @@
+"""compress template json
+
+Moves templates.json into the gzip-compressed, content-addressed
+template_bodies table and backfills existing rows.
+
+Revision ID: b7d3e91f4c60
+Revises: 5e1f0a8c3b27
+Create Date: 2026-10-18 12:20:05.874113
+
+"""
+import gzip
+import hashlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d3e91f4c60'
+down_revision: Union[str, None] = '5e1f0a8c3b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+templates = sa.table(
+    'templates',
+    sa.column('id', sa.Integer),
+    sa.column('json', sa.Text),
+    sa.column('body_hash', sa.String),
+)
+template_bodies = sa.table(
+    'template_bodies',
+    sa.column('hash', sa.String),
+    sa.column('data', sa.LargeBinary),
+    sa.column('size', sa.Integer),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'template_bodies',
+        sa.Column('hash', sa.String(length=64), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('hash'),
+    )
+    op.add_column('templates', sa.Column('body_hash', sa.String(length=64), nullable=True))
+
+    bind = op.get_bind()
+    seen = set()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(templates.c.id, templates.c.json)
+            .where(templates.c.id > last_id)
+            .order_by(templates.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        for template_id, text in rows:
+            raw = text.encode('utf-8')
+            digest = hashlib.sha256(raw).hexdigest()
+            if digest not in seen:
+                data = gzip.compress(raw, compresslevel=6, mtime=0)
+                bind.execute(template_bodies.insert().values(
+                    hash=digest, data=data, size=len(raw)))
+                seen.add(digest)
+            bind.execute(templates.update()
+                         .where(templates.c.id == template_id)
+                         .values(body_hash=digest))
+        last_id = rows[-1][0]
+
+    with op.batch_alter_table('templates') as batch_op:
+        batch_op.alter_column('body_hash', existing_type=sa.String(length=64), nullable=False)
+        batch_op.create_foreign_key('fk_templates_body_hash', 'template_bodies',
+                                    ['body_hash'], ['hash'])
+        batch_op.create_index('ix_templates_body_hash', ['body_hash'], unique=False)
+        batch_op.drop_column('json')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('templates', sa.Column('json', sa.Text(), nullable=True))
+
+    bind = op.get_bind()
+    bodies = bind.execute(sa.select(template_bodies.c.hash, template_bodies.c.data))
+    for digest, data in bodies.fetchall():
+        bind.execute(templates.update()
+                     .where(templates.c.body_hash == digest)
+                     .values(json=gzip.decompress(data).decode('utf-8')))
+
+    with op.batch_alter_table('templates') as batch_op:
+        batch_op.alter_column('json', existing_type=sa.Text(), nullable=False)
+        batch_op.drop_index('ix_templates_body_hash')
+        batch_op.drop_constraint('fk_templates_body_hash', type_='foreignkey')
+        batch_op.drop_column('body_hash')
+    op.drop_table('template_bodies')
@@ -1,8 +1,6 @@
 import logging
-import os
 from datetime import datetime, timedelta
 from typing import Optional, List
-import uuid
 import secrets
 
 import cv2
@@ -11,7 +9,7 @@ import torch
 from fastapi import FastAPI, UploadFile, File, Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, RedirectResponse, JSONResponse
+from fastapi.responses import RedirectResponse, JSONResponse, Response
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from pydantic import BaseModel, EmailStr, Field
@@ -20,7 +18,10 @@ from sqlalchemy import create_engine, Column, String, Boolean, Integer
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from databases import Database
-from RRDBNet_arch import RRDBNet
+from app.config import settings as app_settings
+from app.utils.conversion import to_tensor, to_uint8
+from app.utils.model_loader import load_model
+from app.utils.tiling import tiled_forward
 
 # ====================== DATABASE SETUP ======================
 # Update with your credentials
@@ -68,6 +69,18 @@ GOOGLE_CLIENT_ID = "your-google-client-id.apps.googleusercontent.com"
 GOOGLE_CLIENT_SECRET = "your-google-client-secret"
 GOOGLE_REDIRECT_URI = "http://localhost:8001/auth/google/callback"
 
+# Tiled inference (LR pixels); 0 disables tiling
+TILE_SIZE = 256
+TILE_OVERLAP = 16
+
+# Inference precision ("fp32", "bf16", "fp16" on CUDA) and memory format,
+# configured like the main app
+PRECISION = app_settings.INFERENCE_PRECISION
+CHANNELS_LAST = app_settings.INFERENCE_CHANNELS_LAST
+
+# Same checkpoint the main app serves as its default variant
+MODEL_PATH = app_settings.MODEL_PATH or app_settings.MODEL_VARIANTS[app_settings.DEFAULT_MODEL]
+
 # ====================== PYDANTIC MODELS ======================
 
 
@@ -186,11 +199,9 @@ logger = logging.getLogger(__name__)
 
 # Initialize ESRGAN model
 device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-model = RRDBNet(3, 3, 64, 23, gc=32)
-model.load_state_dict(torch.load(
-    'models/RRDB_ESRGAN_x4.pth', map_location=device))
-model.eval()
-model = model.to(device)
+# BGR folded into the weights, so no channel swap on the way in or out
+model = load_model(MODEL_PATH, device,
+                   precision=PRECISION, channels_last=CHANNELS_LAST, bgr=True)
 
 # Database connection events
 
@@ -313,36 +324,25 @@ async def enhance_image(
     file: UploadFile = File(...),
     current_user: UserInDB = Depends(get_current_user)
 ):
-    temp_path = f"temp_{uuid.uuid4()}.jpg"
-    result_path = f"enhanced_{uuid.uuid4()}.png"
-
-    try:
-        # Save uploaded file
-        with open(temp_path, "wb") as buffer:
-            buffer.write(await file.read())
-
-        # Process image
-        img = cv2.imread(temp_path, cv2.IMREAD_COLOR)
-        img = img * 1.0 / 255
-        img = torch.from_numpy(np.transpose(
-            img[:, :, [2, 1, 0]], (2, 0, 1))).float()
-        img_LR = img.unsqueeze(0).to(device)
-
-        with torch.no_grad():
-            output = model(img_LR).data.squeeze(
-            ).float().cpu().clamp_(0, 1).numpy()
-
-        output = np.transpose(output[[2, 1, 0], :, :], (1, 2, 0))
-        output = (output * 255.0).round().astype(np.uint8)
-        cv2.imwrite(result_path, output)
-
-        return FileResponse(result_path, media_type="image/png")
-
-    finally:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
-        if os.path.exists(result_path):
-            os.remove(result_path)
+    # Decode straight from the upload bytes, no temp files
+    data = np.frombuffer(await file.read(), np.uint8)
+    img = cv2.imdecode(data, cv2.IMREAD_COLOR)
+    if img is None:
+        raise HTTPException(status_code=400, detail="Could not decode image")
+
+    img_LR = to_tensor(img, device, bgr=True)
+    with torch.no_grad():
+        if TILE_SIZE and max(img_LR.shape[-2:]) > TILE_SIZE:
+            output = tiled_forward(model, img_LR, TILE_SIZE, TILE_OVERLAP)
+        else:
+            output = model(img_LR)
+        output = to_uint8(output, bgr=True)
+
+    ok, buffer = cv2.imencode(".png", output)
+    if not ok:
+        raise HTTPException(status_code=500, detail="Could not encode image")
+
+    return Response(content=buffer.tobytes(), media_type="image/png")
 
 
 @app.get("/me", response_model=UserInDB)
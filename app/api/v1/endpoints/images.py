@@ -1,51 +1,196 @@
-import os
-import uuid
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
-from fastapi.responses import FileResponse
+from contextlib import nullcontext
+
+from typing import Dict, Optional
+
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse, StreamingResponse
+from app.config import settings
 from app.services.auth import get_current_user
-from app.schemas.user import UserInDB
-from app.utils.image_processing import enhance_image
+from app.services.jobs import job_manager
+from app.schemas.job import JobOut, JobStatus
+from app.schemas.user import UserInDB, UserRole
+from app.utils.image_processing import enhance_image, executor, registry, result_cache
+from app.utils.inference_pool import QueueFullError
+from app.utils import metrics
+from app.utils.output_format import OutputOptions, negotiate_output
+from app.utils.profiling import profiler
 
 router = APIRouter()
 
 
+def output_options(
+    request: Request,
+    format: Optional[str] = Query(None, description="png, webp or jpeg; overrides Accept"),
+    quality: Optional[int] = Query(None, ge=1, le=100, description="JPEG/lossy WebP quality"),
+    png_compression: Optional[int] = Query(None, ge=0, le=9),
+    lossless: bool = Query(False, description="Lossless WebP (ignored for other formats)"),
+    max_size: Optional[int] = Query(None, ge=1,
+                                    description="Downscale so the longer side fits"),
+) -> OutputOptions:
+    try:
+        return negotiate_output(request.headers.get("accept"), format, quality=quality,
+                                png_compression=png_compression, lossless=lossless,
+                                max_size=max_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def model_key(
+    model: Optional[str] = Query(None, description="Model variant, see /images/models"),
+    alpha: Optional[float] = Query(None, ge=0, le=1,
+                                   description="Blend of the interpolation variants "
+                                               "(0 = first, 1 = second)"),
+) -> str:
+    try:
+        return registry.resolve(model, alpha)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def _chunks(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def _image_response(data: bytes, output: OutputOptions,
+                    headers: Optional[Dict[str, str]] = None) -> StreamingResponse:
+    """Stream encoded image bytes from memory, no temp file needed."""
+    headers = {
+        "Content-Disposition": f'attachment; filename="enhanced_image{output.extension}"',
+        "Content-Length": str(len(data)),
+        "Vary": "Accept",
+        **(headers or {}),
+    }
+    return StreamingResponse(_chunks(data, settings.ENHANCE_STREAM_CHUNK_SIZE),
+                             media_type=output.media_type, headers=headers)
+
+
+def require_admin(current_user: UserInDB = Depends(get_current_user)) -> UserInDB:
+    if current_user.role != UserRole.admin:
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+    return current_user
+
+
 @router.post("/enhance")
 async def enhance_user_image(
     file: UploadFile = File(...),
+    output: OutputOptions = Depends(output_options),
+    model: str = Depends(model_key),
     current_user: UserInDB = Depends(get_current_user)
 ):
-    # Create temp directory if it doesn't exist
-    os.makedirs("temp_images", exist_ok=True)
+    """Return the upscaled image as PNG, or as WebP/JPEG when the Accept
+    header prefers image/webp or image/jpeg or ?format= asks for it."""
+    with metrics.stage("upload_read"):
+        content = await file.read()
 
-    temp_path = f"temp_images/temp_{uuid.uuid4()}.jpg"
-    result_path = f"temp_images/enhanced_{uuid.uuid4()}.png"
+    trace_id = profiler.new_trace_id() if profiler.should_sample() else None
+    sampling = profiler.python_sampling(trace_id) if trace_id else nullcontext()
 
     try:
-        # Save uploaded file
-        with open(temp_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-
-        # Process image
-        success = await enhance_image(temp_path, result_path)
-        if not success or not os.path.exists(result_path):
-            raise HTTPException(
-                status_code=500,
-                detail="Failed to process image"
-            )
-
-        return FileResponse(
-            result_path,
-            media_type="image/png",
-            filename="enhanced_image.png"
+        # Process image in memory, no temp files
+        async with sampling:
+            result = await enhance_image(content, trace_id, output, model)
+    except QueueFullError:
+        raise HTTPException(
+            status_code=503,
+            detail="Image enhancement queue is full, try again later",
+            headers={"Retry-After": str(settings.INFERENCE_RETRY_AFTER)}
         )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error processing image: {str(e)}"
         )
-    finally:
-        # Clean up only after successful response
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
-        # Don't delete result_path here - FileResponse needs it
+
+    headers = {"X-Profile-Id": trace_id} if trace_id else None
+    return _image_response(result, output, headers)
+
+
+@router.post("/jobs", response_model=JobOut, status_code=202)
+async def create_enhance_job(
+    file: UploadFile = File(...),
+    output: OutputOptions = Depends(output_options),
+    model: str = Depends(model_key),
+    current_user: UserInDB = Depends(get_current_user)
+):
+    # Output options are fixed at submission, the result is encoded once
+    content = await file.read()
+    try:
+        return job_manager.submit(content, current_user.id, output, model)
+    except QueueFullError:
+        raise HTTPException(
+            status_code=503,
+            detail="Job queue is full, try again later",
+            headers={"Retry-After": str(settings.INFERENCE_RETRY_AFTER)}
+        )
+
+
+@router.get("/jobs/{job_id}", response_model=JobOut)
+def get_enhance_job(
+    job_id: str,
+    current_user: UserInDB = Depends(get_current_user)
+):
+    job = job_manager.get(job_id, current_user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/jobs/{job_id}/result")
+def get_enhance_job_result(
+    job_id: str,
+    current_user: UserInDB = Depends(get_current_user)
+):
+    job = job_manager.get(job_id, current_user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status == JobStatus.failed:
+        raise HTTPException(status_code=409, detail=f"Job failed: {job.error}")
+    if job.status != JobStatus.done:
+        raise HTTPException(
+            status_code=409,
+            detail="Job is not finished",
+            headers={"Retry-After": "1"}
+        )
+    return _image_response(job.result, job.output)
+
+
+@router.get("/models")
+def list_models(current_user: UserInDB = Depends(get_current_user)):
+    stats = registry.stats()
+    return {"default": stats["default"], "variants": stats["variants"],
+            "interpolation": stats["interpolation"]}
+
+
+@router.post("/profiling/window")
+def open_profiling_window(
+    seconds: float = Query(60, gt=0, le=3600),
+    current_user: UserInDB = Depends(require_admin)
+):
+    """Profile every /images/enhance call for the next `seconds`."""
+    return {"profiling_until": profiler.open_window(seconds)}
+
+
+@router.get("/profiling")
+def list_profiles(current_user: UserInDB = Depends(require_admin)):
+    return profiler.list_traces()
+
+
+@router.get("/profiling/{name}")
+def download_profile(name: str, current_user: UserInDB = Depends(require_admin)):
+    # Only serve files the profiler itself listed, never arbitrary paths
+    if name not in {trace["name"] for trace in profiler.list_traces()}:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(profiler.path(name), filename=name)
+
+
+@router.get("/stats")
+def enhance_stats(current_user: UserInDB = Depends(require_admin)):
+    return {
+        "executor": executor.stats(),
+        "cache": result_cache.stats(),
+        "jobs": job_manager.stats(),
+        "models": registry.stats(),
+    }
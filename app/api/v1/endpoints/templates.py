@@ -1,40 +1,140 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import gzip
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from app.schemas.template import TemplateCreate, TemplateOut, TemplateDetail
 from app.services import template as template_service
-from app.database import get_db
+from app.services.template import CachedResponse, template_cache
+from app.config import settings
+from app.utils.compression import weak_etag
+from app.utils.content_coding import accepts_encoding, negotiate_encoding
+from app.database import get_async_db
 from app.services.auth import get_current_user
 from app.models.user import User, UserRole
 
 router = APIRouter()
 
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def _conditional_response(request: Request, cached: CachedResponse,
+                          cache_control: str) -> Response:
+    headers = {"ETag": cached.etag, "Cache-Control": cache_control, **cached.headers}
+    if cached.last_modified:
+        headers["Last-Modified"] = cached.last_modified
+    if _etag_matches(request.headers.get("if-none-match"), cached.etag):
+        if _compressed(request, cached.body):
+            # Same validators as the 200, which CompressionMiddleware rewrites
+            headers["ETag"] = weak_etag(cached.etag)
+            headers["Vary"] = "Accept-Encoding"
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+
+def _compressed(request: Request, body: bytes) -> bool:
+    """Whether CompressionMiddleware compresses `body` for this request."""
+    return (settings.COMPRESSION_ENABLED and len(body) >= settings.COMPRESSION_MIN_SIZE
+            and negotiate_encoding(request.headers.get("accept-encoding")) is not None)
+
+
 @router.post("/", response_model=TemplateOut)
-def create_template(
+async def create_template(
     template: TemplateCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     if current_user.role not in [UserRole.admin, UserRole.designer]:
         raise HTTPException(status_code=403, detail="Insufficient permissions")
-    return template_service.create_template(db, template, current_user.id)
+    return await template_service.create_template_async(db, template, current_user.id)
 
 @router.get("/", response_model=List[TemplateOut])
-def list_templates(
+async def list_templates(
+    request: Request,
     width: Optional[int] = None,
     height: Optional[int] = None,
     category: Optional[str] = None,
-    db: Session = Depends(get_db)
+    cursor: Optional[int] = Query(None, description="X-Next-Cursor of the previous page"),
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    return template_service.get_templates(db, width, height, category)
+    key = ("list", width, height, category, cursor, limit)
+    cached = template_cache.get(key)
+    if cached is None:
+        generation = template_cache.generation
+        # Fetch one extra row to know whether another page follows
+        templates = await template_service.get_templates_async(
+            db, width, height, category, after_id=cursor, limit=limit + 1)
+        headers = {}
+        if len(templates) > limit:
+            templates = templates[:limit]
+            next_cursor = str(templates[-1].id)
+            headers["X-Next-Cursor"] = next_cursor
+            next_url = request.url.include_query_params(cursor=next_cursor)
+            headers["Link"] = f'<{next_url}>; rel="next"'
+        body = "[" + ",".join(TemplateOut.model_validate(t).model_dump_json()
+                              for t in templates) + "]"
+        cached = template_service.serialize_response(
+            body.encode(), (t.updated_at for t in templates), headers)
+        template_cache.put(key, cached, generation)
+    return _conditional_response(request, cached, "no-cache")
 
 @router.get("/{template_id}", response_model=TemplateDetail)
-def get_template(
+async def get_template(
+    template_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    key = ("detail", template_id)
+    cached = template_cache.get(key)
+    if cached is None:
+        generation = template_cache.generation
+        template = await template_service.get_template_by_id_async(db, template_id)
+        if not template:
+            raise HTTPException(status_code=404, detail="Template not found")
+        cached = template_service.serialize_response(
+            # Not .json(): the json field shadows BaseModel.json
+            TemplateDetail.model_validate(template).model_dump_json().encode(),
+            [template.updated_at])
+        template_cache.put(key, cached, generation)
+    return _conditional_response(request, cached, "private, no-cache")
+
+@router.get("/{template_id}/json")
+async def get_template_json(
     template_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    template = template_service.get_template_by_id(db, template_id)
-    if not template:
-        raise HTTPException(status_code=404, detail="Template not found")
-    return template
+    """Raw canvas JSON, sent as the stored gzip bytes when the client accepts it."""
+    key = ("json", template_id)
+    cached = template_cache.get(key)
+    if cached is None:
+        generation = template_cache.generation
+        body = await template_service.get_template_body_async(db, template_id)
+        if not body:
+            raise HTTPException(status_code=404, detail="Template not found")
+        # Bodies are content-addressed, so the hash is a strong ETag as is
+        cached = CachedResponse(body.data, f'"{body.hash}"')
+        template_cache.put(key, cached, generation)
+
+    use_gzip = accepts_encoding(request.headers.get("accept-encoding"), "gzip")
+    # Each content-coding is its own representation and needs its own ETag
+    etag = cached.etag[:-1] + '-gzip"' if use_gzip else cached.etag
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Accept-Encoding"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=cached.body, media_type="application/json", headers=headers)
+    return Response(content=gzip.decompress(cached.body), media_type="application/json",
+                    headers=headers)
@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.schemas.user import UserCreate, UserInDB, UserBase
-from app.models.user import User
-from app.database import get_db
-from app.utils.security import get_password_hash
-from app.services.auth import get_current_user
+from app.schemas.user import UserCreate, UserInDB, UserBase, UserRoleUpdate
+from app.models.user import User, UserRole
+from app.database import get_async_db, get_db
+from app.utils.security import HasherBusyError, password_hasher
+from app.services.auth import get_current_user, principal_cache
 from app.services import template as template_service
 
 
@@ -14,15 +16,23 @@ router = APIRouter()
 
 
 @router.post("/", response_model=UserInDB)
-async def create_user(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.email == user.email).first()
+async def create_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    query = select(User).filter(User.email == user.email)
+    db_user = (await db.execute(query)).scalar_one_or_none()
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
 
-    hashed_password = get_password_hash(user.password)
+    try:
+        hashed_password = await password_hasher.hash(user.password)
+    except HasherBusyError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many requests in progress, try again later",
+            headers={"Retry-After": "1"}
+        )
     db_user = User(
         email=user.email,
         full_name=user.full_name,
@@ -30,17 +40,37 @@ async def create_user(user: UserCreate, db: Session = Depends(get_db)):
         role=user.role or "user"
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user, ["templates"])
     return db_user
 
 
 @router.get("/me", response_model=UserBase)
-def read_users_me(
-    db: Session = Depends(get_db),
+async def read_users_me(
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     user_data = UserBase.from_orm(current_user)
-    user_data.templates = template_service.get_templates_by_user(
+    user_data.templates = await template_service.get_templates_by_user_async(
         db, current_user.id)
     return user_data
+
+
+@router.patch("/{user_id}/role", response_model=UserInDB)
+def update_user_role(
+    user_id: int,
+    update: UserRoleUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    if current_user.role != UserRole.admin:
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+    db_user = db.query(User).filter(User.id == user_id).first()
+    if not db_user:
+        raise HTTPException(status_code=404, detail="User not found")
+    db_user.role = update.role.value
+    db.commit()
+    db.refresh(db_user)
+    # Cached principals still carry the old role
+    principal_cache.invalidate_user(db_user.email)
+    return db_user
@@ -1,13 +1,52 @@
-from fastapi import FastAPI
+import time
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
 from app.api.v1.api_v1 import api_router
 from app.config import settings
-from app.database import engine, Base
+from app.database import engine, Base, dispose_async_engine
+from app.utils import metrics
+from app.utils.compression import CompressionMiddleware
 
 app = FastAPI(title=settings.PROJECT_NAME)
 
+if settings.MODEL_PRELOAD:
+    # Load before workers fork so they share the weights copy-on-write
+    from app.utils.image_processing import preload_model
+    preload_model()
+
 # Include API routers
 app.include_router(api_router, prefix="/api/v1")
 
+
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.REGISTRY.render(),
+                             media_type="text/plain; version=0.0.4")
+
+
+async def record_http_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    with metrics.HTTP_IN_FLIGHT.track():
+        response = await call_next(request)
+    route = request.scope.get("route")
+    metrics.HTTP_REQUEST_SECONDS.observe(
+        time.perf_counter() - start,
+        method=request.method,
+        route=route.path if route is not None else "unmatched",
+        status=str(response.status_code))
+    return response
+
+
+# Only pay for the middleware when metrics are on
+if settings.METRICS_ENABLED:
+    app.middleware("http")(record_http_metrics)
+
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_SIZE)
+
 # Create database tables (for development)
 
 
@@ -16,6 +55,13 @@ def startup():
     Base.metadata.create_all(bind=engine)
 
 
+@app.on_event("shutdown")
+async def shutdown():
+    from app.utils.image_processing import executor
+    executor.shutdown()
+    await dispose_async_engine()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8009)
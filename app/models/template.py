@@ -1,18 +1,69 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey
+import gzip
+import hashlib
+
+from sqlalchemy import (Column, DateTime, Integer, LargeBinary, String, ForeignKey, Index,
+                        func)
 from sqlalchemy.orm import relationship
+from app.config import settings
 from app.database import Base
 
 
+class TemplateBody(Base):
+    """Gzip-compressed canvas JSON, shared by every template with the same
+    content (keyed by the SHA-256 of the uncompressed text)."""
+    __tablename__ = "template_bodies"
+
+    hash = Column(String(64), primary_key=True)
+    data = Column(LargeBinary, nullable=False)
+    size = Column(Integer, nullable=False)
+
+    @staticmethod
+    def digest(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def from_text(cls, text: str) -> "TemplateBody":
+        raw = text.encode("utf-8")
+        # mtime=0 keeps the compressed bytes identical for identical input
+        data = gzip.compress(raw, compresslevel=settings.TEMPLATE_JSON_COMPRESSION_LEVEL,
+                             mtime=0)
+        return cls(hash=hashlib.sha256(raw).hexdigest(), data=data, size=len(raw))
+
+    def text(self) -> str:
+        return gzip.decompress(self.data).decode("utf-8")
+
+
 class Template(Base):
     __tablename__ = "templates"
+    __table_args__ = (
+        # Filtered listings and per-creator lookups
+        Index("ix_templates_category_width_height", "category", "width", "height"),
+        Index("ix_templates_creator_id", "creator_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False)
     category = Column(String(100), nullable=False)
     width = Column(Integer, nullable=False)
     height = Column(Integer, nullable=False)
-    json = Column(Text, nullable=False)
+    body_hash = Column(String(64),
+                       ForeignKey("template_bodies.hash", name="fk_templates_body_hash"),
+                       nullable=False, index=True)
     image = Column(String(255), nullable=True)
 
+    # Bumped by the ORM on every UPDATE; used for Last-Modified and
+    # optimistic concurrency
+    updated_at = Column(DateTime(timezone=True), nullable=False,
+                        server_default=func.now(), onupdate=func.now())
+    revision = Column(Integer, nullable=False, server_default="1")
+
     creator_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     creator = relationship("User", back_populates="templates")
+    # Only loaded for detail views; list queries never touch it
+    body = relationship("TemplateBody")
+
+    __mapper_args__ = {"version_id_col": revision}
+
+    @property
+    def json(self) -> str:
+        return self.body.text()
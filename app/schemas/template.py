@@ -19,7 +19,7 @@ class TemplateOut(TemplateBase):
     creator_id: int
 
     class Config:
-        orm_mode = True
+        from_attributes = True
 
 
 class TemplateDetail(TemplateOut):
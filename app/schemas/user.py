@@ -27,6 +27,10 @@ class UserLogin(BaseModel):
     password: str
 
 
+class UserRoleUpdate(BaseModel):
+    role: UserRole
+
+
 class UserInDB(UserBase):
     id: int
     disabled: bool = False
@@ -0,0 +1,139 @@
+import asyncio
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from app.config import settings
+from app.schemas.job import JobStatus
+from app.utils.image_processing import enhance_image
+from app.utils.inference_pool import QueueFullError
+from app.utils.output_format import OutputOptions
+
+
+@dataclass
+class Job:
+    id: str
+    owner_id: int
+    status: JobStatus
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+    error: Optional[str] = None
+    result: Optional[bytes] = None
+    output: OutputOptions = OutputOptions()
+    model_key: Optional[str] = None
+
+
+class JobManager:
+    """In-process queue of enhancement jobs.
+
+    At most `concurrency` jobs run at once, at most `max_pending` may be
+    queued or running, and finished jobs (with their results) are dropped
+    `ttl_seconds` after completion, or earlier, oldest first, while the
+    results held exceed `max_result_bytes`.
+    """
+
+    def __init__(
+        self,
+        process: Callable[..., Awaitable[bytes]],
+        concurrency: int = 1,
+        ttl_seconds: int = 3600,
+        max_pending: int = 100,
+        max_result_bytes: int = 512 * 1024 * 1024,
+    ):
+        self.process = process
+        self.concurrency = max(1, concurrency)
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.max_pending = max_pending
+        self.max_result_bytes = max_result_bytes
+        self.result_bytes = 0
+        self._jobs: Dict[str, Job] = {}
+        # Ids of jobs holding a result, oldest first
+        self._results: "OrderedDict[str, int]" = OrderedDict()
+        self._tasks: Set[asyncio.Task] = set()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._tasks)
+
+    def _expire(self) -> None:
+        now = datetime.utcnow()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.expires_at is not None and job.expires_at <= now]
+        for job_id in expired:
+            self._drop(job_id)
+
+    def _drop(self, job_id: str) -> None:
+        del self._jobs[job_id]
+        self.result_bytes -= self._results.pop(job_id, 0)
+
+    def _store_result(self, job: Job, result: bytes) -> None:
+        job.result = result
+        self._results[job.id] = len(result)
+        self.result_bytes += len(result)
+        while self.result_bytes > self.max_result_bytes and len(self._results) > 1:
+            self._drop(next(iter(self._results)))
+
+    def submit(self, data: bytes, owner_id: int,
+               output: OutputOptions = OutputOptions(),
+               model_key: Optional[str] = None) -> Job:
+        self._expire()
+        if self.pending >= self.max_pending:
+            raise QueueFullError("Job queue is full")
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        job = Job(id=uuid.uuid4().hex, owner_id=owner_id,
+                  status=JobStatus.queued, created_at=datetime.utcnow(),
+                  output=output, model_key=model_key)
+        self._jobs[job.id] = job
+        task = asyncio.create_task(self._run(job, data))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get(self, job_id: str, owner_id: int) -> Optional[Job]:
+        self._expire()
+        job = self._jobs.get(job_id)
+        if job is None or job.owner_id != owner_id:
+            return None
+        return job
+
+    async def _run(self, job: Job, data: bytes) -> None:
+        async with self._semaphore:
+            job.status = JobStatus.running
+            try:
+                while True:
+                    try:
+                        result = await self.process(
+                            data, options=job.output, model_key=job.model_key)
+                        break
+                    except QueueFullError:
+                        # Sync traffic has the executor saturated; wait our turn
+                        await asyncio.sleep(0.5)
+                job.status = JobStatus.done
+            except Exception as e:
+                job.status = JobStatus.failed
+                job.error = str(e)
+            job.finished_at = datetime.utcnow()
+            job.expires_at = job.finished_at + self.ttl
+            if job.status == JobStatus.done:
+                self._store_result(job, result)
+
+    def stats(self) -> Dict[str, int]:
+        counts = {status.value: 0 for status in JobStatus}
+        for job in self._jobs.values():
+            counts[job.status.value] += 1
+        counts["result_bytes"] = self.result_bytes
+        counts["max_result_bytes"] = self.max_result_bytes
+        return counts
+
+
+job_manager = JobManager(enhance_image,
+                         concurrency=settings.JOB_CONCURRENCY,
+                         ttl_seconds=settings.JOB_RESULT_TTL_SECONDS,
+                         max_pending=settings.JOB_MAX_PENDING,
+                         max_result_bytes=settings.JOB_MAX_RESULT_BYTES)
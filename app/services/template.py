@@ -1,30 +1,200 @@
-from sqlalchemy.orm import Session
-from app.models.template import Template
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Dict, Hashable, Iterable, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
+from app.config import settings
+from app.models.template import Template, TemplateBody
 from app.schemas.template import TemplateCreate
 
 
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str
+    last_modified: Optional[str] = None
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+def serialize_response(body: bytes, updated: Iterable[datetime],
+                       headers: Dict[str, str] = None) -> CachedResponse:
+    """Wrap a serialized body with a strong ETag and the newest updated_at."""
+    etag = '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+    newest = max((dt for dt in updated if dt is not None), default=None)
+    last_modified = None
+    if newest is not None:
+        if newest.tzinfo is None:
+            newest = newest.replace(tzinfo=timezone.utc)
+        last_modified = format_datetime(newest.astimezone(timezone.utc), usegmt=True)
+    return CachedResponse(body, etag, last_modified, dict(headers or {}))
+
+
+class TemplateResponseCache:
+    """LRU of serialized template responses so unchanged polls skip both the
+    database and Pydantic.
+
+    Cleared whenever a template is created in this process; other worker
+    processes pick the change up once `ttl_seconds` have passed.
+    """
+
+    def __init__(self, ttl_seconds: float, max_size: int):
+        self.ttl = ttl_seconds
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, Tuple[float, CachedResponse]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by clear(); responses built from a query that started
+        # before the last clear are not stored
+        self.generation = 0
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, response = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return response
+
+    def put(self, key: Hashable, response: CachedResponse, generation: int) -> None:
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = (time.time() + self.ttl, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+
+template_cache = TemplateResponseCache(settings.TEMPLATE_CACHE_TTL_SECONDS,
+                                       settings.TEMPLATE_CACHE_MAX_SIZE)
+
+
+def store_body(db: Session, text: str) -> TemplateBody:
+    """Return the stored body for `text`, adding it if no template shares it yet.
+
+    The insert runs in a savepoint so that losing a race with a concurrent
+    create of the same body re-reads the winner's row instead of failing.
+    """
+    body = db.get(TemplateBody, TemplateBody.digest(text))
+    if body is not None:
+        return body
+    body = TemplateBody.from_text(text)
+    try:
+        with db.begin_nested():
+            db.add(body)
+    except IntegrityError:
+        body = db.get(TemplateBody, body.hash)
+    return body
+
+
 def create_template(db: Session, template_data: TemplateCreate, user_id: int):
-    template = Template(**template_data.dict(), creator_id=user_id)
+    data = template_data.dict()
+    body = store_body(db, data.pop("json"))
+    template = Template(**data, body=body, creator_id=user_id)
     db.add(template)
     db.commit()
+    template_cache.clear()
     db.refresh(template)
     return template
 
 
-def get_templates(db: Session, width: int = None, height: int = None, category: str = None):
-    query = db.query(Template)
+def _filter_templates(query, width: int = None, height: int = None, category: str = None):
     if width:
         query = query.filter(Template.width == width)
     if height:
         query = query.filter(Template.height == height)
     if category:
         query = query.filter(Template.category == category)
-    return query.all()
+    return query
+
+
+def _page(query, after_id: int = None, limit: int = None):
+    # Keyset pagination on the primary key. The json body lives in
+    # template_bodies and is never loaded for list views.
+    query = query.order_by(Template.id)
+    if after_id is not None:
+        query = query.filter(Template.id > after_id)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def get_templates(db: Session, width: int = None, height: int = None, category: str = None,
+                  after_id: int = None, limit: int = None):
+    query = _filter_templates(db.query(Template), width, height, category)
+    return _page(query, after_id, limit).all()
 
 
 def get_template_by_id(db: Session, template_id: int):
-    return db.query(Template).filter(Template.id == template_id).first()
+    return db.query(Template).options(joinedload(Template.body)) \
+        .filter(Template.id == template_id).first()
 
 
 def get_templates_by_user(db: Session, user_id: int):
-    return db.query(Template).filter(Template.creator_id == user_id).all()
+    query = db.query(Template).filter(Template.creator_id == user_id)
+    return _page(query).all()
+
+
+# Async versions for routes running on the event loop
+
+
+async def store_body_async(db: AsyncSession, text: str) -> TemplateBody:
+    body = await db.get(TemplateBody, TemplateBody.digest(text))
+    if body is not None:
+        return body
+    body = TemplateBody.from_text(text)
+    try:
+        async with db.begin_nested():
+            db.add(body)
+    except IntegrityError:
+        body = await db.get(TemplateBody, body.hash)
+    return body
+
+
+async def create_template_async(db: AsyncSession, template_data: TemplateCreate, user_id: int):
+    data = template_data.dict()
+    body = await store_body_async(db, data.pop("json"))
+    template = Template(**data, body=body, creator_id=user_id)
+    db.add(template)
+    await db.commit()
+    template_cache.clear()
+    await db.refresh(template)
+    return template
+
+
+async def get_templates_async(db: AsyncSession, width: int = None, height: int = None,
+                              category: str = None, after_id: int = None, limit: int = None):
+    query = _filter_templates(select(Template), width, height, category)
+    return (await db.execute(_page(query, after_id, limit))).scalars().all()
+
+
+async def get_template_by_id_async(db: AsyncSession, template_id: int):
+    return await db.get(Template, template_id, options=[joinedload(Template.body)])
+
+
+async def get_template_body_async(db: AsyncSession, template_id: int):
+    query = select(TemplateBody).join(Template).filter(Template.id == template_id)
+    return (await db.execute(query)).scalar_one_or_none()
+
+
+async def get_templates_by_user_async(db: AsyncSession, user_id: int):
+    query = select(Template).filter(Template.creator_id == user_id)
+    return (await db.execute(_page(query))).scalars().all()
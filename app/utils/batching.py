@@ -0,0 +1,88 @@
+import asyncio
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+import torch
+
+from app.utils.inference_pool import QueueFullError
+
+
+class MicroBatcher:
+    """Collects concurrent forward requests for a few milliseconds and runs them
+    as one stacked batch.
+
+    Requests are grouped by tensor shape, so whole images of the same size and
+    the interior tiles of tiled images share a forward pass. The forward call
+    itself is handed to `run` (the default loop executor unless given) so the
+    event loop stays responsive. At most `max_queue` requests may wait to
+    be batched; beyond that `submit` raises QueueFullError.
+    """
+
+    def __init__(
+        self,
+        forward: Callable[[torch.Tensor], torch.Tensor],
+        max_batch_size: int = 4,
+        max_wait_ms: float = 5.0,
+        run: Optional[Callable[..., Awaitable[Any]]] = None,
+        max_queue: int = 32,
+    ):
+        self.forward = forward
+        self.run = run
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_queue = max(1, max_queue)
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    async def submit(self, img: torch.Tensor) -> torch.Tensor:
+        """Queue a 1xCxHxW tensor and wait for its 1xCxH'xW' result."""
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._worker = loop.create_task(self._run())
+        future = loop.create_future()
+        try:
+            self._queue.put_nowait((img, future))
+        except asyncio.QueueFull:
+            raise QueueFullError("Batching queue is full") from None
+        return await future
+
+    async def _collect(self) -> List[Tuple[torch.Tensor, asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _call_forward(self, batch: torch.Tensor) -> torch.Tensor:
+        if self.run is not None:
+            return await self.run(self.forward, batch)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.forward, batch)
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            groups = defaultdict(list)
+            for img, future in batch:
+                groups[tuple(img.shape)].append((img, future))
+
+            for group in groups.values():
+                stacked = torch.cat([img for img, _ in group])
+                try:
+                    output = await self._call_forward(stacked)
+                except Exception as e:
+                    for _, future in group:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                for i, (_, future) in enumerate(group):
+                    if not future.done():
+                        future.set_result(output[i:i + 1])
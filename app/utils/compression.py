@@ -0,0 +1,87 @@
+from typing import List, Tuple
+
+from app.utils.content_coding import ENCODERS, negotiate_encoding
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+def weak_etag(etag: str) -> str:
+    """The ETag a compressed response carries; 304s for it must match."""
+    return etag if etag.startswith("W/") else "W/" + etag
+
+
+class CompressionMiddleware:
+    """ASGI middleware that compresses JSON and text responses.
+
+    The coding (zstd, br or gzip, whichever are installed) is negotiated from
+    Accept-Encoding. Bodies under `minimum_size` bytes, other media types
+    (images are already compressed) and responses that already carry a
+    Content-Encoding, e.g. pre-compressed template JSON, pass through
+    untouched. A strong ETag on a compressed response is made weak, since
+    the bytes no longer match the identity representation it names.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+        coding = negotiate_encoding(accept)
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        chunks: List[bytes] = []
+
+        async def send_compressed(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                if self._compressible(message["headers"]):
+                    start = message
+                else:
+                    await send(message)
+                return
+            if start is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            # Buffer the whole body; JSON responses are sent in one piece anyway
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            body = b"".join(chunks)
+            headers = [(k, v) for k, v in start["headers"]
+                       if k not in (b"content-length", b"vary")]
+            vary = [v for k, v in start["headers"] if k == b"vary"]
+            if len(body) >= self.minimum_size:
+                body = ENCODERS[coding](body)
+                headers = [(k, weak_etag(v.decode("latin-1")).encode("latin-1")
+                            if k == b"etag" else v) for k, v in headers]
+                headers.append((b"content-encoding", coding.encode()))
+                vary.append(b"Accept-Encoding")
+            if vary:
+                headers.append((b"vary", b", ".join(vary)))
+            headers.append((b"content-length", str(len(body)).encode()))
+            await send({**start, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+    @staticmethod
+    def _compressible(headers: List[Tuple[bytes, bytes]]) -> bool:
+        content_type = b""
+        for name, value in headers:
+            if name == b"content-encoding":
+                return False
+            if name == b"content-type":
+                content_type = value
+        return content_type.decode("latin-1").startswith(COMPRESSIBLE_TYPES)
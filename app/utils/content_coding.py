@@ -0,0 +1,91 @@
+import gzip
+from typing import Callable, Dict, Optional, Sequence
+
+try:
+    import brotli
+except ImportError:  # optional: br is only offered when installed
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional: zstd is only offered when installed
+    zstandard = None
+
+
+def _parse_qlist(header: Optional[str]) -> Dict[str, float]:
+    """Map each token of an Accept-style header to its q-value."""
+    values = {}
+    for part in (header or "").split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        values[token] = q
+    return values
+
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """Map each coding in an Accept-Encoding header to its q-value."""
+    return _parse_qlist(header)
+
+
+def accepts_encoding(header: Optional[str], coding: str) -> bool:
+    codings = parse_accept_encoding(header)
+    return codings.get(coding, codings.get("*", 0.0)) > 0
+
+
+# Levels favour speed: responses are compressed on every request
+ENCODERS: Dict[str, Callable[[bytes], bytes]] = {
+    "gzip": lambda data: gzip.compress(data, compresslevel=6),
+}
+if brotli is not None:
+    ENCODERS["br"] = lambda data: brotli.compress(data, quality=5)
+if zstandard is not None:
+    ENCODERS["zstd"] = zstandard.ZstdCompressor(level=3).compress
+
+# Server preference when the client weighs several codings equally
+ENCODING_PREFERENCE = ("zstd", "br", "gzip")
+
+
+def negotiate_encoding(header: Optional[str],
+                       available: Sequence[str] = None) -> Optional[str]:
+    """Pick the best available coding the client accepts, or None for identity."""
+    codings = parse_accept_encoding(header)
+    best, best_q = None, 0.0
+    for coding in ENCODING_PREFERENCE:
+        if coding not in ENCODERS or (available is not None and coding not in available):
+            continue
+        q = codings.get(coding, codings.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def negotiate_media_type(header: Optional[str], offered: Sequence[str]) -> Optional[str]:
+    """Pick one of `offered` media types for an Accept header.
+
+    Higher q wins; on a tie an explicitly listed type beats a wildcard
+    match, then the earlier entry of `offered`. A missing header accepts
+    the first offer, and None means nothing offered is acceptable.
+    """
+    if not header:
+        return offered[0] if offered else None
+    accept = _parse_qlist(header)
+    best, best_rank = None, (0.0, 0)
+    for media_type in offered:
+        main = media_type.split("/")[0]
+        for specificity, pattern in ((2, media_type), (1, f"{main}/*"), (0, "*/*")):
+            if pattern in accept:
+                rank = (accept[pattern], specificity)
+                if rank[0] > 0 and rank > best_rank:
+                    best, best_rank = media_type, rank
+                break
+    return best
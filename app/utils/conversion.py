@@ -0,0 +1,100 @@
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+import numpy as np
+import torch
+
+# Channel i of the tensor is taken from / written to this channel of the
+# BGR image when the model works in RGB
+RGB_FROM_BGR = (2, 1, 0)
+
+
+def to_tensor(img: np.ndarray, device: torch.device, bgr: bool = False) -> torch.Tensor:
+    """BGR uint8 HWC image -> 1x3xHxW float32 tensor in [0, 1].
+
+    The only full-size allocation is the float32 result: the uint8 pixels
+    are converted while they are copied in, with the channel swap (skipped
+    when `bgr`, for models with the swap folded into their weights) done by
+    the copy rather than by fancy indexing.
+    """
+    height, width = img.shape[:2]
+    src = torch.from_numpy(img)
+    if device.type != "cpu":
+        # Upload the uint8 pixels, a quarter of the float32 size
+        src = src.to(device, non_blocking=True)
+    out = torch.empty((1, 3, height, width), dtype=torch.float32, device=device)
+    if bgr:
+        out[0].copy_(src.permute(2, 0, 1))
+    else:
+        for channel, source in enumerate(RGB_FROM_BGR):
+            out[0, channel].copy_(src[:, :, source])
+    return out.div_(255)
+
+
+class OutputBuffers:
+    """Pool of uint8 HWC buffers reused across requests.
+
+    `acquire` checks a buffer out for the duration of a `with` block and
+    returns it afterwards; at most `max_buffers` idle buffers are kept, so
+    memory held between requests is bounded no matter how many threads
+    encode. Outputs larger than `max_bytes` get a fresh array so one huge
+    image is never pooled.
+    """
+
+    def __init__(self, max_bytes: int, max_buffers: int = 2):
+        self.max_bytes = max_bytes
+        self.max_buffers = max(0, max_buffers)
+        self._free: List[np.ndarray] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self, height: int, width: int) -> Iterator[np.ndarray]:
+        size = height * width * 3
+        if size > self.max_bytes:
+            yield np.empty((height, width, 3), dtype=np.uint8)
+            return
+        with self._lock:
+            # Smallest idle buffer that fits
+            fits = [i for i, b in enumerate(self._free) if b.size >= size]
+            buffer = None
+            if fits:
+                buffer = self._free.pop(min(fits, key=lambda i: self._free[i].size))
+        if buffer is None:
+            buffer = np.empty(size, dtype=np.uint8)
+        try:
+            yield buffer[:size].reshape(height, width, 3)
+        finally:
+            self._release(buffer)
+
+    def _release(self, buffer: np.ndarray) -> None:
+        with self._lock:
+            if len(self._free) < self.max_buffers:
+                self._free.append(buffer)
+                return
+            # Pool is full: keep the larger buffers
+            smallest = min(range(len(self._free)), key=lambda i: self._free[i].size,
+                           default=None)
+            if smallest is not None and self._free[smallest].size < buffer.size:
+                self._free[smallest] = buffer
+
+
+def to_uint8(output: torch.Tensor, bgr: bool = False,
+             out: Optional[np.ndarray] = None) -> np.ndarray:
+    """1x3xHxW float tensor in [0, 1] -> BGR uint8 HWC image.
+
+    Clamps and rounds `output` in place (it is consumed), then converts
+    while copying into `out` (allocated if not given), so no float64 or
+    extra float32 copy of the full-size output is made.
+    """
+    chw = output[0].clamp_(0, 1).mul_(255).round_()
+    height, width = chw.shape[-2:]
+    if out is None:
+        out = np.empty((height, width, 3), dtype=np.uint8)
+    dst = torch.from_numpy(out)
+    if bgr:
+        dst.copy_(chw.permute(1, 2, 0))
+    else:
+        for channel, source in enumerate(RGB_FROM_BGR):
+            dst[:, :, channel].copy_(chw[source])
+    return out
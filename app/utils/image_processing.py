@@ -1,43 +1,234 @@
+import asyncio
 import cv2
 import numpy as np
 import torch
-from RRDBNet_arch import RRDBNet
 import os
+import time
+from functools import partial
+from typing import Callable, Dict, Optional
+from app.config import settings
+from app.utils.batching import MicroBatcher
+from app.utils.conversion import OutputBuffers, to_tensor, to_uint8
+from app.utils import metrics
+from app.utils.inference_pool import InferenceExecutor
+from app.utils.model_loader import InferenceModel, load_interpolated, load_model
+from app.utils.model_registry import ModelRegistry
+from app.utils.output_format import OutputOptions
+from app.utils.profiling import profiler
+from app.utils.result_cache import ResultCache, cache_key
+from app.utils.tiling import tiled_forward, tiled_forward_async
 
 device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
 
-# Initialize model
-model = RRDBNet(3, 3, 64, 23, gc=32)
-model.load_state_dict(torch.load(
-    'app/models/RRDB_ESRGAN_x4.pth', map_location=device))
-model.eval()
-model = model.to(device)
-
-
-async def enhance_image(input_path: str, output_path: str) -> bool:
-    try:
-        # Read image
-        img = cv2.imread(input_path, cv2.IMREAD_COLOR)
-        if img is None:
-            raise ValueError("Could not read image file")
-
-        # Convert and normalize
-        img = img * 1.0 / 255
-        img = torch.from_numpy(np.transpose(
-            img[:, :, [2, 1, 0]], (2, 0, 1))).float()
-        img_LR = img.unsqueeze(0).to(device)
-
-        # Enhance
-        with torch.no_grad():
-            output = model(img_LR).data.squeeze(
-            ).float().cpu().clamp_(0, 1).numpy()
-
-        # Save output
-        output = np.transpose(output[[2, 1, 0], :, :], (1, 2, 0))
-        output = (output * 255.0).round().astype(np.uint8)
-        cv2.imwrite(output_path, output)
-
-        return os.path.exists(output_path)
-    except Exception as e:
-        print(f"Error enhancing image: {e}")
-        return False
+def _variants() -> Dict[str, str]:
+    variants = dict(settings.MODEL_VARIANTS)
+    if settings.MODEL_PATH:
+        variants[settings.DEFAULT_MODEL] = settings.MODEL_PATH
+    return variants
+
+
+def _timed(key: str, load: Callable[[], InferenceModel]) -> InferenceModel:
+    start = time.perf_counter()
+    model = load()
+    metrics.MODEL_LOAD_SECONDS.set(time.perf_counter() - start, model=key)
+    return model
+
+
+def _load_variant(path: str) -> InferenceModel:
+    return _timed(os.path.basename(path), lambda: load_model(
+        path, device,
+        precision=settings.INFERENCE_PRECISION,
+        channels_last=settings.INFERENCE_CHANNELS_LAST,
+        optimize=settings.TORCHSCRIPT_OPTIMIZE,
+        mmap=settings.MODEL_MMAP,
+        bgr=True))
+
+
+def _load_blend(path_a: str, path_b: str, alpha: float) -> InferenceModel:
+    return _timed(f"interp:{alpha:.2f}", lambda: load_interpolated(
+        path_a, path_b, alpha, device,
+        precision=settings.INFERENCE_PRECISION,
+        channels_last=settings.INFERENCE_CHANNELS_LAST,
+        bgr=True))
+
+
+# Variants are loaded lazily by get_model()
+registry = ModelRegistry(_variants(), settings.DEFAULT_MODEL,
+                         load=_load_variant, interpolate=_load_blend,
+                         interp_from=settings.MODEL_INTERP_FROM,
+                         interp_to=settings.MODEL_INTERP_TO,
+                         max_resident=settings.MODEL_MAX_RESIDENT)
+
+
+def get_model(key: Optional[str] = None) -> InferenceModel:
+    """Model for a registry key (the default variant if None), loaded on
+    first use; safe to call from any thread."""
+    return registry.get(key)
+
+
+def set_model(model: InferenceModel, key: Optional[str] = None) -> None:
+    """Install an already-built model, e.g. random weights for benchmarks.
+
+    The service works on BGR tensors end to end, so the model is switched
+    to BGR (in place) if it is not already. It is pinned in the registry,
+    since there is no path to reload it from after an eviction.
+    """
+    registry.install(key or registry.default, model.to_bgr(), pin=True)
+
+
+def preload_model() -> None:
+    """Load the default model up front, e.g. in a pre-fork master so that
+    workers inherit the weights copy-on-write instead of loading their own."""
+    get_model()
+
+
+@torch.no_grad()
+def forward_batch(batch: torch.Tensor, key: Optional[str] = None) -> torch.Tensor:
+    with metrics.stage("forward"):
+        return get_model(key)(batch)
+
+
+executor = InferenceExecutor(mode=settings.INFERENCE_EXECUTOR,
+                             max_workers=settings.INFERENCE_WORKERS,
+                             torch_threads=settings.INFERENCE_TORCH_THREADS,
+                             max_queue=settings.INFERENCE_MAX_QUEUE)
+
+# Reused uint8 output images, checked out for each encode
+output_buffers = OutputBuffers(settings.ENHANCE_OUTPUT_BUFFER_BYTES,
+                               settings.ENHANCE_OUTPUT_BUFFERS)
+
+result_cache = ResultCache(settings.RESULT_CACHE_MEMORY_BYTES,
+                           directory=settings.RESULT_CACHE_DIR,
+                           max_disk_bytes=settings.RESULT_CACHE_DISK_BYTES)
+
+metrics.REGISTRY.register(metrics.Gauge(
+    "inference_queue_depth", "Inference calls waiting for a worker",
+    callback=lambda: executor.queue_depth))
+metrics.REGISTRY.register(metrics.Gauge(
+    "inference_in_flight", "Inference calls running on a worker",
+    callback=lambda: executor.in_flight))
+
+# One micro-batcher per model key, since only requests for the same
+# weights can share a forward pass
+_batchers: Dict[str, MicroBatcher] = {}
+
+
+def get_batcher(key: Optional[str] = None) -> MicroBatcher:
+    key = key or registry.default
+    batcher = _batchers.get(key)
+    if batcher is None:
+        batcher = _batchers[key] = MicroBatcher(
+            partial(forward_batch, key=key),
+            max_batch_size=settings.ENHANCE_BATCH_MAX_SIZE,
+            max_wait_ms=settings.ENHANCE_BATCH_MAX_WAIT_MS,
+            run=executor.run,
+            # As many waiting requests as fill the executor queue with full batches
+            max_queue=settings.ENHANCE_BATCH_MAX_SIZE * settings.INFERENCE_MAX_QUEUE)
+    return batcher
+
+
+def _should_tile(img_LR: torch.Tensor) -> bool:
+    tile_size = settings.ENHANCE_TILE_SIZE
+    return bool(tile_size) and max(img_LR.shape[-2:]) > tile_size
+
+
+@torch.no_grad()
+def upscale(img_LR: torch.Tensor, model_key: Optional[str] = None) -> torch.Tensor:
+    """Run a model on an NCHW tensor, tiling it when it exceeds the tile size."""
+    model = get_model(model_key)
+    with metrics.stage("forward"):
+        if _should_tile(img_LR):
+            return tiled_forward(model, img_LR, settings.ENHANCE_TILE_SIZE,
+                                 settings.ENHANCE_TILE_OVERLAP)
+        return model(img_LR)
+
+
+async def upscale_async(img_LR: torch.Tensor, model_key: Optional[str] = None) -> torch.Tensor:
+    """Upscale through the micro-batcher, which runs on the inference executor."""
+    batcher = get_batcher(model_key)
+    if _should_tile(img_LR):
+        return await tiled_forward_async(
+            batcher.submit, img_LR, settings.ENHANCE_TILE_SIZE,
+            settings.ENHANCE_TILE_OVERLAP,
+            concurrency=settings.ENHANCE_BATCH_MAX_SIZE)
+    return await batcher.submit(img_LR)
+
+
+def decode_image(data: bytes) -> torch.Tensor:
+    with metrics.stage("decode"):
+        img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("Could not decode image")
+    if settings.METRICS_ENABLED:
+        metrics.INPUT_MEGAPIXELS.inc(img.shape[0] * img.shape[1] / 1e6)
+
+    # The model reads BGR, so this is a single uint8 -> float32 copy
+    with metrics.stage("to_tensor"):
+        return to_tensor(img, device, bgr=True)
+
+
+def encode_image(output: torch.Tensor, options: OutputOptions = OutputOptions()) -> bytes:
+    """Encode a BGR model output; `output` is clamped in place."""
+    with output_buffers.acquire(*output.shape[-2:]) as out:
+        with metrics.stage("to_numpy"):
+            img = to_uint8(output, bgr=True, out=out)
+        with metrics.stage("encode"):
+            return options.encode(img)
+
+
+def enhance_bytes(data: bytes, trace_id: Optional[str] = None,
+                  options: OutputOptions = OutputOptions(),
+                  model_key: Optional[str] = None) -> bytes:
+    """Blocking decode -> upscale -> encode pipeline, run inside the executor.
+
+    With a `trace_id` the forward pass is recorded by torch.profiler.
+    """
+    img_LR = decode_image(data)
+    with profiler.torch_trace(trace_id):
+        output = upscale(img_LR, model_key)
+    return encode_image(output, options)
+
+
+def _result_options(options: OutputOptions) -> dict:
+    # Tiling changes the output slightly, so it is part of the cache key
+    return {**options.cache_options(),
+            "precision": settings.INFERENCE_PRECISION,
+            "tile_size": settings.ENHANCE_TILE_SIZE,
+            "tile_overlap": settings.ENHANCE_TILE_OVERLAP}
+
+
+async def _run_enhance(data: bytes, trace_id: Optional[str],
+                       options: OutputOptions, model_key: Optional[str]) -> bytes:
+    if not settings.ENHANCE_BATCHING:
+        return await executor.run(enhance_bytes, data, trace_id, options, model_key)
+
+    # Decode/encode on the default thread pool, forward passes on the
+    # inference executor via the batcher
+    img_LR = await asyncio.to_thread(decode_image, data)
+    output = await upscale_async(img_LR, model_key)
+    return await asyncio.to_thread(encode_image, output, options)
+
+
+async def enhance_image(data: bytes, trace_id: Optional[str] = None,
+                        options: OutputOptions = OutputOptions(),
+                        model_key: Optional[str] = None) -> bytes:
+    """Upscale an encoded image entirely in memory and return it encoded as
+    `options` asks (PNG by default). `model_key` comes from
+    `registry.resolve` and defaults to the default variant.
+
+    Results are served from the content-addressed cache when possible.
+    `trace_id` records a torch profile of the forward pass (not available
+    with micro-batching, where passes are shared between requests).
+    Raises ValueError for undecodable input and QueueFullError when the
+    inference executor is saturated.
+    """
+    with metrics.track(metrics.ENHANCE_IN_FLIGHT):
+        with metrics.stage("cache_lookup"):
+            key = cache_key(data, registry.model_id(model_key), _result_options(options))
+            result = await asyncio.to_thread(result_cache.get, key)
+        if result is not None:
+            return result
+
+        result = await _run_enhance(data, trace_id, options, model_key)
+        await asyncio.to_thread(result_cache.put, key, result)
+        return result
@@ -0,0 +1,104 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+import torch
+
+
+class QueueFullError(Exception):
+    """Raised when the inference executor has no room for another request."""
+
+
+def _init_worker(torch_threads: int) -> None:
+    if torch_threads > 0:
+        torch.set_num_threads(torch_threads)
+
+
+class InferenceExecutor:
+    """Runs blocking inference work off the event loop.
+
+    mode="thread" uses a thread pool sharing the module-level model, with
+    `torch_threads` as the intra-op thread budget. mode="process" uses a
+    process pool where every worker imports the model module and therefore
+    holds its own RRDBNet copy; functions passed to `run` must be picklable.
+
+    At most `max_workers` calls run at once and `max_queue` more may wait;
+    anything beyond that raises QueueFullError instead of queueing forever.
+    """
+
+    def __init__(
+        self,
+        mode: str = "thread",
+        max_workers: int = 1,
+        torch_threads: int = 0,
+        max_queue: int = 8,
+    ):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown executor mode: {mode}")
+        self.mode = mode
+        self.max_workers = max(1, max_workers)
+        self.torch_threads = torch_threads
+        self.max_queue = max(0, max_queue)
+        self._pool: Optional[Executor] = None
+        self._pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.mode == "process":
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.torch_threads,))
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="inference",
+                    initializer=_init_worker,
+                    initargs=(self.torch_threads,))
+        return self._pool
+
+    @property
+    def in_flight(self) -> int:
+        return min(self._pending, self.max_workers)
+
+    @property
+    def queue_depth(self) -> int:
+        return max(self._pending - self.max_workers, 0)
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if self._pending >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise QueueFullError("Inference queue is full")
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_pool(), fn, *args)
+        except BaseException:
+            self.failed += 1
+            raise
+        finally:
+            self._pending -= 1
+        self.completed += 1
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "workers": self.max_workers,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,189 @@
+import logging
+from collections import OrderedDict
+from typing import Optional
+
+import torch
+import torch.nn as nn
+
+from RRDBNet_arch import RRDBNet
+
+logger = logging.getLogger(__name__)
+
+# Inference precision -> autocast dtype (None runs the model as-is in fp32)
+PRECISIONS = {
+    "fp32": None,
+    "bf16": torch.bfloat16,
+    "fp16": torch.float16,
+}
+
+
+BGR = [2, 1, 0]
+
+
+def fold_bgr(model: RRDBNet) -> RRDBNet:
+    """Permute the first and last conv so the generator reads and writes BGR
+    directly, i.e. OpenCV's channel order needs no swap on either side.
+
+    Only these small tensors are replaced, mmapped trunk weights stay shared.
+    """
+    first, last = model.conv_first, model.conv_last
+    first.weight = nn.Parameter(first.weight.detach()[:, BGR].contiguous(), requires_grad=False)
+    last.weight = nn.Parameter(last.weight.detach()[BGR].contiguous(), requires_grad=False)
+    last.bias = nn.Parameter(last.bias.detach()[BGR].contiguous(), requires_grad=False)
+    return model
+
+
+class InferenceModel(nn.Module):
+    """Wraps a generator with the precision and memory format chosen at load.
+
+    Weights stay in fp32; reduced precision runs under torch.autocast so
+    convolutions execute in bf16/fp16 while outputs come back as fp32.
+    After `to_bgr()` the model takes and returns BGR tensors.
+    """
+
+    def __init__(self, model: nn.Module, precision: str = "fp32", channels_last: bool = False):
+        super(InferenceModel, self).__init__()
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision: {precision}")
+        self.model = model
+        self.precision = precision
+        self.dtype: Optional[torch.dtype] = PRECISIONS[precision]
+        self.channels_last = channels_last
+        self.bgr = False
+        self._flip = False
+
+    def to_bgr(self) -> "InferenceModel":
+        """Switch to BGR input/output. Eager RRDBNets get the swap folded into
+        their weights; TorchScript models fall back to flipping channels."""
+        if not self.bgr:
+            if isinstance(self.model, RRDBNet):
+                fold_bgr(self.model)
+            else:
+                self._flip = True
+            self.bgr = True
+        return self
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        if self._flip:
+            x = x.flip(1)
+        if self.channels_last:
+            x = x.contiguous(memory_format=torch.channels_last)
+        if self.dtype is None:
+            out = self.model(x)
+        else:
+            with torch.autocast(device_type=x.device.type, dtype=self.dtype):
+                out = self.model(x).float()
+        return out.flip(1) if self._flip else out
+
+
+def build_model(state_dict=None, assign: bool = False) -> RRDBNet:
+    model = RRDBNet(3, 3, 64, 23, gc=32)
+    if state_dict is not None:
+        # assign=True keeps the loaded tensors (e.g. mmapped) instead of
+        # copying them into freshly allocated parameters
+        model.load_state_dict(state_dict, strict=True, assign=assign)
+    return model.eval()
+
+
+def load_scripted(path: str, device: torch.device, optimize: bool = False) -> torch.jit.ScriptModule:
+    """Load a TorchScript artifact from export_RRDB_torchscript.py or
+    quantize_RRDB_models.py, optionally running the inference graph passes."""
+    for engine in ("x86", "fbgemm"):
+        if engine in torch.backends.quantized.supported_engines:
+            torch.backends.quantized.engine = engine
+            break
+    module = torch.jit.load(path, map_location=device).eval()
+    if optimize:
+        try:
+            module = torch.jit.optimize_for_inference(module)
+        except RuntimeError as e:
+            # Quantized graphs do not support every pass
+            logger.warning(f"optimize_for_inference failed for {path}: {e}")
+    return module
+
+
+def load_model(
+    path: str,
+    device: torch.device,
+    precision: str = "fp32",
+    channels_last: bool = False,
+    optimize: bool = True,
+    mmap: bool = False,
+    bgr: bool = False,
+) -> InferenceModel:
+    """Load a generator ready for inference on `device`.
+
+    `.pth` files are RRDBNet state dicts; `.pt` files are TorchScript
+    artifacts (quantized int8 models only run in fp32 on CPU), optimized for
+    inference when `optimize` is set.
+
+    With `mmap` on CPU the state dict is memory-mapped and used in place, so
+    every process serving the same file shares one physical copy of the
+    weights through the page cache. channels_last re-lays the weights out and
+    therefore gives each process a private copy again.
+
+    With `bgr` the returned model takes and returns BGR tensors (see
+    InferenceModel.to_bgr).
+    """
+    if precision == "fp16" and device.type != "cuda":
+        raise ValueError("fp16 inference is only supported on CUDA, use bf16 on CPU")
+    if path.endswith(".pt"):
+        module = load_scripted(path, device, optimize=optimize)
+        model = InferenceModel(module, precision, channels_last).eval()
+        return model.to_bgr() if bgr else model
+    model = None
+    if mmap and device.type == "cpu":
+        try:
+            state_dict = torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+            model = build_model(state_dict, assign=True)
+        except (RuntimeError, TypeError) as e:
+            # Checkpoints in the legacy (pre-zipfile) format cannot be mmapped,
+            # and torch before 2.1 has no mmap / assign arguments
+            logger.warning(f"Could not mmap {path}, loading a private copy: {e}")
+    if model is None:
+        model = build_model(torch.load(path, map_location=device)).to(device)
+    return _wrap(model, precision, channels_last, bgr)
+
+
+def _wrap(model: RRDBNet, precision: str, channels_last: bool, bgr: bool) -> InferenceModel:
+    model = InferenceModel(model, precision, channels_last).eval()
+    if bgr:
+        model.to_bgr()
+    if channels_last:
+        model = model.to(memory_format=torch.channels_last)
+    return model
+
+
+def _read_state_dict(path: str):
+    # mmap so the tensors are read from the page cache, not copied; legacy
+    # checkpoints and torch before 2.1 fall back to a private copy
+    try:
+        return torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+    except (RuntimeError, TypeError):
+        return torch.load(path, map_location="cpu")
+
+
+def interpolate_state_dicts(net_a, net_b, alpha: float) -> "OrderedDict[str, torch.Tensor]":
+    """(1 - alpha) * net_a + alpha * net_b for every tensor, as in net_interp.py."""
+    return OrderedDict((k, (1 - alpha) * v_a + alpha * net_b[k]) for k, v_a in net_a.items())
+
+
+def load_interpolated(
+    path_a: str,
+    path_b: str,
+    alpha: float,
+    device: torch.device,
+    precision: str = "fp32",
+    channels_last: bool = False,
+    bgr: bool = False,
+) -> InferenceModel:
+    """Build a generator from two RRDBNet state dicts blended at `alpha`
+    (0 gives `path_a`, 1 gives `path_b`). The blend is a new set of weights,
+    so it is never shared between processes."""
+    if path_a.endswith(".pt") or path_b.endswith(".pt"):
+        raise ValueError("Only .pth state dicts can be interpolated")
+    if precision == "fp16" and device.type != "cuda":
+        raise ValueError("fp16 inference is only supported on CUDA, use bf16 on CPU")
+    net_a, net_b = _read_state_dict(path_a), _read_state_dict(path_b)
+    model = build_model(interpolate_state_dicts(net_a, net_b, alpha), assign=True)
+    return _wrap(model.to(device), precision, channels_last, bgr)
@@ -0,0 +1,144 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from app.utils.model_loader import InferenceModel
+
+INTERP_PREFIX = "interp:"
+
+
+class ModelRegistry:
+    """Named generator variants, plus blends of two of them, loaded lazily.
+
+    A model key is either a variant name or "interp:<alpha>" for the blend
+    (1 - alpha) * interp_from + alpha * interp_to; use `resolve` to turn
+    request parameters into a key. Each key is loaded on first use (one
+    load at a time per key) and at most `max_resident` models stay loaded,
+    least recently used first out. Models installed with `pin=True` (e.g.
+    built in code rather than loaded from a variant's path) are never
+    evicted and do not count towards that limit. An evicted model stays
+    alive until the requests still holding it finish.
+    """
+
+    def __init__(
+        self,
+        variants: Dict[str, str],
+        default: str,
+        load: Callable[[str], InferenceModel],
+        interpolate: Callable[[str, str, float], InferenceModel],
+        interp_from: Optional[str] = None,
+        interp_to: Optional[str] = None,
+        max_resident: int = 3,
+    ):
+        if default not in variants:
+            raise ValueError(f"Default model {default!r} is not a configured variant")
+        self.variants = dict(variants)
+        self.default = default
+        self._load_path = load
+        self._interpolate = interpolate
+        self.interp_from = interp_from
+        self.interp_to = interp_to
+        self.max_resident = max(1, max_resident)
+        self.loads = 0
+        self.evictions = 0
+        self._resident: "OrderedDict[str, InferenceModel]" = OrderedDict()
+        self._pinned: Dict[str, InferenceModel] = {}
+        self._lock = threading.Lock()
+        self._loading: Dict[str, threading.Lock] = {}
+
+    @property
+    def can_interpolate(self) -> bool:
+        return self.interp_from in self.variants and self.interp_to in self.variants
+
+    def resolve(self, name: Optional[str] = None, alpha: Optional[float] = None) -> str:
+        """Model key for a request; raises ValueError for unknown variants or
+        bad alphas. Alphas are rounded to two decimals so the number of
+        distinct blends stays bounded."""
+        if alpha is None:
+            name = name or self.default
+            if name not in self.variants:
+                raise ValueError(f"Unknown model: {name}")
+            return name
+        if name is not None:
+            raise ValueError("Pass either a model name or an alpha, not both")
+        if not self.can_interpolate:
+            raise ValueError("Model interpolation is not configured")
+        if not 0 <= alpha <= 1:
+            raise ValueError("alpha must be between 0 and 1")
+        alpha = round(alpha, 2)
+        if alpha == 0:
+            return self.interp_from
+        if alpha == 1:
+            return self.interp_to
+        return f"{INTERP_PREFIX}{alpha:.2f}"
+
+    def model_id(self, key: Optional[str] = None) -> str:
+        """Identifies the weights behind a key, e.g. for result cache keys."""
+        key = key or self.default
+        if key.startswith(INTERP_PREFIX):
+            return f"{key}:{self.model_id(self.interp_from)}:{self.model_id(self.interp_to)}"
+        return os.path.splitext(os.path.basename(self.variants[key]))[0]
+
+    def get(self, key: Optional[str] = None) -> InferenceModel:
+        key = key or self.default
+        with self._lock:
+            model = self._touch(key)
+            if model is not None:
+                return model
+            loading = self._loading.setdefault(key, threading.Lock())
+        with loading:
+            with self._lock:
+                model = self._touch(key)
+            if model is None:
+                model = self._load(key)
+                self.install(key, model)
+        return model
+
+    def install(self, key: str, model: InferenceModel, pin: bool = False) -> None:
+        with self._lock:
+            if pin:
+                self._resident.pop(key, None)
+                self._pinned[key] = model
+                return
+            if key in self._pinned:
+                return
+            if key not in self._resident:
+                self.loads += 1
+            self._resident[key] = model
+            self._resident.move_to_end(key)
+            while len(self._resident) > self.max_resident:
+                self._resident.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            resident = list(self._resident)
+            pinned = list(self._pinned)
+        return {
+            "default": self.default,
+            "variants": sorted(self.variants),
+            "interpolation": [self.interp_from, self.interp_to] if self.can_interpolate else None,
+            "resident": resident,
+            "pinned": pinned,
+            "max_resident": self.max_resident,
+            "loads": self.loads,
+            "evictions": self.evictions,
+        }
+
+    def _touch(self, key: str) -> Optional[InferenceModel]:
+        if key in self._pinned:
+            return self._pinned[key]
+        model = self._resident.get(key)
+        if model is not None:
+            self._resident.move_to_end(key)
+        return model
+
+    def _load(self, key: str) -> InferenceModel:
+        if key.startswith(INTERP_PREFIX):
+            alpha = float(key[len(INTERP_PREFIX):])
+            return self._interpolate(self.variants[self.interp_from],
+                                     self.variants[self.interp_to], alpha)
+        if key not in self.variants:
+            raise ValueError(f"Unknown model: {key}")
+        return self._load_path(self.variants[key])
@@ -0,0 +1,111 @@
+from dataclasses import asdict, dataclass
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+from app.config import settings
+from app.utils.content_coding import negotiate_media_type
+
+# format -> (media type, file extension)
+FORMATS = {
+    "png": ("image/png", ".png"),
+    "webp": ("image/webp", ".webp"),
+    "jpeg": ("image/jpeg", ".jpg"),
+}
+MEDIA_TYPES = {media_type: fmt for fmt, (media_type, _) in FORMATS.items()}
+ALIASES = {"jpg": "jpeg"}
+
+
+@dataclass(frozen=True)
+class OutputOptions:
+    """How an enhanced image is encoded.
+
+    `quality` (1-100) applies to JPEG and lossy WebP, `png_compression`
+    (0-9) to PNG; both default to the configured values. `lossless` selects
+    lossless WebP and is ignored (reset to False) for other formats, and
+    `max_size` downscales the result so its longer side is at most that
+    many pixels.
+    """
+    format: str = "png"
+    quality: Optional[int] = None
+    png_compression: Optional[int] = None
+    lossless: bool = False
+    max_size: Optional[int] = None
+
+    def __post_init__(self):
+        object.__setattr__(self, "format", ALIASES.get(self.format, self.format))
+        if self.format not in FORMATS:
+            raise ValueError(f"Unsupported output format: {self.format}")
+        if self.format != "webp":
+            # Keeps equivalent options equal, e.g. in result cache keys
+            object.__setattr__(self, "lossless", False)
+        if self.quality is not None and not 1 <= self.quality <= 100:
+            raise ValueError("quality must be between 1 and 100")
+        if self.png_compression is not None and not 0 <= self.png_compression <= 9:
+            raise ValueError("png_compression must be between 0 and 9")
+        if self.max_size is not None and self.max_size < 1:
+            raise ValueError("max_size must be positive")
+
+    @property
+    def media_type(self) -> str:
+        return FORMATS[self.format][0]
+
+    @property
+    def extension(self) -> str:
+        return FORMATS[self.format][1]
+
+    def resolved_quality(self) -> Optional[int]:
+        if self.format == "webp":
+            # OpenCV switches WebP to lossless for qualities above 100
+            return 101 if self.lossless else self.quality or settings.WEBP_QUALITY
+        if self.format == "jpeg":
+            return self.quality or settings.JPEG_QUALITY
+        return None
+
+    def resolved_png_compression(self) -> Optional[int]:
+        if self.format != "png":
+            return None
+        if self.png_compression is None:
+            return settings.PNG_COMPRESSION
+        return self.png_compression
+
+    def imencode_params(self) -> List[int]:
+        if self.format == "webp":
+            return [cv2.IMWRITE_WEBP_QUALITY, self.resolved_quality()]
+        if self.format == "jpeg":
+            return [cv2.IMWRITE_JPEG_QUALITY, self.resolved_quality()]
+        return [cv2.IMWRITE_PNG_COMPRESSION, self.resolved_png_compression()]
+
+    def encode(self, img: np.ndarray) -> bytes:
+        """Encode a BGR uint8 HWC image, downscaling it first if needed."""
+        height, width = img.shape[:2]
+        if self.max_size and max(height, width) > self.max_size:
+            scale = self.max_size / max(height, width)
+            size = (max(1, round(width * scale)), max(1, round(height * scale)))
+            img = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+        ok, buffer = cv2.imencode(self.extension, img, self.imencode_params())
+        if not ok:
+            raise RuntimeError("Could not encode image")
+        return buffer.tobytes()
+
+    def cache_options(self) -> dict:
+        # Resolved values, so changing a configured default changes the key
+        return {**asdict(self), "quality": self.resolved_quality(),
+                "png_compression": self.resolved_png_compression()}
+
+
+def negotiate_output(accept: Optional[str], format: Optional[str] = None,
+                     **options) -> OutputOptions:
+    """Build output options, taking the format from an Accept header unless
+    `format` is given explicitly.
+
+    PNG is offered first, so it wins unless the client prefers image/webp or
+    image/jpeg; an Accept header that matches none of them (e.g. a bare
+    application/json) also gets PNG rather than a 406. Raises ValueError for
+    invalid options.
+    """
+    if format is None:
+        media_type = negotiate_media_type(accept, [media for media, _ in FORMATS.values()])
+        format = MEDIA_TYPES.get(media_type, "png")
+    return OutputOptions(format=format, **options)
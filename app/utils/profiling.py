@@ -0,0 +1,144 @@
+"""Opt-in profiling of sampled requests.
+
+A sampled request gets two artifacts in PROFILING_DIR:
+
+* ``<id>.torch.json``: a torch.profiler Chrome trace of the forward pass
+  (open in chrome://tracing or Perfetto)
+* ``<id>.py.folded``: Python stacks from a sampling profiler in collapsed
+  format (flamegraph.pl, speedscope)
+
+Requests are sampled at PROFILING_SAMPLE_RATE, or all of them while an
+admin-opened window is active. Only the newest PROFILING_MAX_FILES files are
+kept. torch.profiler allows one session per process, so a sampled forward
+pass that overlaps another one gets no torch trace.
+"""
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import asynccontextmanager, contextmanager
+from typing import List, Optional
+
+import torch
+
+from app.config import settings
+
+
+class StackSampler(threading.Thread):
+    """Samples the Python stacks of every other thread at a fixed interval."""
+
+    def __init__(self, interval: float):
+        super(StackSampler, self).__init__(daemon=True, name="stack-sampler")
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}"
+                                 f":{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+    def write_folded(self, path: str) -> None:
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class Profiler:
+    def __init__(self, directory: str, sample_rate: float, max_files: int, interval_ms: float):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.max_files = max_files
+        self.interval = interval_ms / 1000.0
+        self.window_until = 0.0
+        self._trace_lock = threading.Lock()
+
+    def should_sample(self) -> bool:
+        if time.time() < self.window_until:
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def open_window(self, seconds: float) -> float:
+        """Profile every request for the next `seconds`; returns the end time."""
+        self.window_until = time.time() + seconds
+        return self.window_until
+
+    def new_trace_id(self) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    @contextmanager
+    def torch_trace(self, trace_id: Optional[str]):
+        """Record a Chrome trace of the torch ops run in this block."""
+        if trace_id is None or not self._trace_lock.acquire(blocking=False):
+            yield
+            return
+        try:
+            with torch.profiler.profile(
+                    activities=[torch.profiler.ProfilerActivity.CPU]) as prof:
+                yield
+            prof.export_chrome_trace(self.path(f"{trace_id}.torch.json"))
+        finally:
+            self._trace_lock.release()
+        self._enforce_limit()
+
+    @asynccontextmanager
+    async def python_sampling(self, trace_id: str):
+        """Sample Python stacks of all threads for the duration of this block.
+
+        Stopping the sampler and writing its file run on a thread, off the
+        event loop.
+        """
+        sampler = StackSampler(self.interval)
+        sampler.start()
+        try:
+            yield
+        finally:
+            await asyncio.to_thread(self._finish_sampling, sampler, trace_id)
+
+    def _finish_sampling(self, sampler: StackSampler, trace_id: str) -> None:
+        sampler.stop()
+        sampler.write_folded(self.path(f"{trace_id}.py.folded"))
+        self._enforce_limit()
+
+    def list_traces(self) -> List[dict]:
+        if not os.path.isdir(self.directory):
+            return []
+        entries = [e for e in os.scandir(self.directory) if e.is_file()]
+        entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+        return [{"name": e.name, "bytes": e.stat().st_size} for e in entries]
+
+    def _enforce_limit(self) -> None:
+        for entry in self.list_traces()[self.max_files:]:
+            try:
+                os.remove(self.path(entry["name"]))
+            except FileNotFoundError:
+                pass
+
+
+profiler = Profiler(settings.PROFILING_DIR,
+                    sample_rate=settings.PROFILING_SAMPLE_RATE,
+                    max_files=settings.PROFILING_MAX_FILES,
+                    interval_ms=settings.PROFILING_INTERVAL_MS)
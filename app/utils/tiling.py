@@ -0,0 +1,115 @@
+import asyncio
+from typing import Awaitable, Callable, List, Tuple
+
+import torch
+
+Box = Tuple[int, int, int, int]
+
+
+def _tile_starts(size: int, tile_size: int, overlap: int) -> List[int]:
+    if size <= tile_size:
+        return [0]
+    stride = max(tile_size - overlap, 1)
+    starts = list(range(0, size - tile_size, stride))
+    # Last tile is pinned to the border so every pixel is covered
+    starts.append(size - tile_size)
+    return starts
+
+
+def tile_boxes(height: int, width: int, tile_size: int, overlap: int) -> List[Box]:
+    """Return (y0, y1, x0, x1) boxes covering a height x width image."""
+    boxes = []
+    for y0 in _tile_starts(height, tile_size, overlap):
+        for x0 in _tile_starts(width, tile_size, overlap):
+            boxes.append((y0, min(y0 + tile_size, height),
+                          x0, min(x0 + tile_size, width)))
+    return boxes
+
+
+def _ramp(length: int, fade: int, fade_in: bool, fade_out: bool) -> torch.Tensor:
+    weights = torch.ones(length)
+    fade = min(fade, length)
+    if fade > 0:
+        ramp = (torch.arange(fade, dtype=torch.float32) + 0.5) / fade
+        if fade_in:
+            weights[:fade] = torch.minimum(weights[:fade], ramp)
+        if fade_out:
+            weights[-fade:] = torch.minimum(weights[-fade:], ramp.flip(0))
+    return weights
+
+
+class TileAccumulator:
+    """Blends upscaled tiles into one output using linear ramps over the overlap.
+
+    Only the output and a single-channel weight map are kept in memory, so
+    activation memory is bounded by the tile size rather than the image size.
+    """
+
+    def __init__(self, height: int, width: int, scale: int, overlap: int):
+        self.height = height
+        self.width = width
+        self.scale = scale
+        self.overlap = overlap
+        self.output = None
+        self.weight = None
+
+    def add(self, box: Box, tile: torch.Tensor) -> None:
+        y0, y1, x0, x1 = box
+        s = self.scale
+        if self.output is None:
+            n, c = tile.shape[:2]
+            self.output = torch.zeros(
+                (n, c, self.height * s, self.width * s),
+                dtype=torch.float32, device=tile.device)
+            self.weight = torch.zeros(
+                (1, 1, self.height * s, self.width * s),
+                dtype=torch.float32, device=tile.device)
+
+        fade = self.overlap * s
+        wy = _ramp((y1 - y0) * s, fade, y0 > 0, y1 < self.height)
+        wx = _ramp((x1 - x0) * s, fade, x0 > 0, x1 < self.width)
+        w = (wy[:, None] * wx[None, :]).to(tile.device)[None, None]
+
+        self.output[:, :, y0 * s:y1 * s, x0 * s:x1 * s] += tile.float() * w
+        self.weight[:, :, y0 * s:y1 * s, x0 * s:x1 * s] += w
+
+    def result(self) -> torch.Tensor:
+        return self.output.div_(self.weight)
+
+
+def tiled_forward(
+    forward: Callable[[torch.Tensor], torch.Tensor],
+    img: torch.Tensor,
+    tile_size: int,
+    overlap: int = 16,
+    scale: int = 4,
+) -> torch.Tensor:
+    """Run `forward` over overlapping tiles of an NCHW tensor and blend the seams."""
+    height, width = img.shape[-2:]
+    accumulator = TileAccumulator(height, width, scale, overlap)
+    for box in tile_boxes(height, width, tile_size, overlap):
+        y0, y1, x0, x1 = box
+        accumulator.add(box, forward(img[:, :, y0:y1, x0:x1]))
+    return accumulator.result()
+
+
+async def tiled_forward_async(
+    forward: Callable[[torch.Tensor], Awaitable[torch.Tensor]],
+    img: torch.Tensor,
+    tile_size: int,
+    overlap: int = 16,
+    scale: int = 4,
+    concurrency: int = 4,
+) -> torch.Tensor:
+    """Async variant of `tiled_forward` that keeps up to `concurrency` tiles in
+    flight, e.g. so a MicroBatcher can stack them into one forward pass."""
+    height, width = img.shape[-2:]
+    accumulator = TileAccumulator(height, width, scale, overlap)
+    boxes = tile_boxes(height, width, tile_size, overlap)
+    for i in range(0, len(boxes), concurrency):
+        chunk = boxes[i:i + concurrency]
+        outputs = await asyncio.gather(
+            *(forward(img[:, :, y0:y1, x0:x1]) for y0, y1, x0, x1 in chunk))
+        for box, output in zip(chunk, outputs):
+            accumulator.add(box, output)
+    return accumulator.result()
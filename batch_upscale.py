@@ -0,0 +1,228 @@
+"""Batch upscaler for large image backfills.
+
+Runs a three-stage pipeline so disk I/O, decoding, inference and encoding
+overlap instead of running strictly in sequence:
+
+    decode workers -> batched inference (same-size images stacked) -> encode workers
+
+Outputs that already exist are skipped (unless --overwrite), so an
+interrupted run can simply be restarted. Per-stage throughput is printed at the end.
+
+    python batch_upscale.py --input 'LR/*' --output results --batch-size 4
+"""
+import argparse
+import glob
+import os
+import os.path as osp
+import queue
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+import torch
+
+from app.utils.model_loader import load_model
+from app.utils.output_format import OutputOptions
+from app.utils.tiling import tiled_forward
+
+
+class StageStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.busy = defaultdict(float)
+        self.items = defaultdict(int)
+
+    def add(self, stage: str, seconds: float, items: int = 1) -> None:
+        with self._lock:
+            self.busy[stage] += seconds
+            self.items[stage] += items
+
+    def report(self, wall: float) -> None:
+        print(f"{'stage':>9} {'images':>7} {'busy s':>8} {'img/s busy':>11}")
+        for stage in ("decode", "inference", "encode"):
+            busy = self.busy[stage]
+            rate = self.items[stage] / busy if busy else 0.0
+            print(f"{stage:>9} {self.items[stage]:>7} {busy:>8.2f} {rate:>11.2f}")
+        done = self.items["encode"]
+        print(f"{done} images in {wall:.2f}s wall ({done / wall if wall else 0:.2f} img/s)")
+
+
+def output_options(args) -> OutputOptions:
+    return OutputOptions(format=args.format, quality=args.quality,
+                         png_compression=args.png_compression,
+                         lossless=args.lossless, max_size=args.max_size)
+
+
+def output_path(args, path: str) -> str:
+    base = osp.splitext(osp.basename(path))[0]
+    return osp.join(args.output, f"{base}{args.suffix}{output_options(args).extension}")
+
+
+def main(args):
+    os.makedirs(args.output, exist_ok=True)
+    paths = sorted(glob.glob(args.input))
+    todo = [p for p in paths
+            if args.overwrite or not osp.exists(output_path(args, p))]
+    print(f"{len(paths)} inputs, {len(paths) - len(todo)} already done, {len(todo)} to process")
+    if not todo:
+        return
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    device = torch.device(args.device)
+    model = load_model(args.model, device, precision=args.precision,
+                       channels_last=args.channels_last)
+    options = output_options(args)
+    stats = StageStats()
+    decoded: "queue.Queue" = queue.Queue(maxsize=args.prefetch)
+    # Set when inference fails, so decode workers stop instead of blocking
+    # forever on a full queue nobody reads
+    stop = threading.Event()
+    # Bounds the upscaled images waiting for an encode worker
+    encode_slots = threading.BoundedSemaphore(args.encode_workers * 2)
+    encodes = []
+    failures = []
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                decoded.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def decode(path):
+        if stop.is_set():
+            return
+        start = time.perf_counter()
+        img = cv2.imread(path, cv2.IMREAD_COLOR)
+        stats.add("decode", time.perf_counter() - start)
+        if img is None:
+            failures.append(path)
+            return
+        put((path, img))
+
+    def encode(path, img):
+        start = time.perf_counter()
+        try:
+            data = options.encode(img)
+            # Write then rename so a partial file is never taken as done
+            target = output_path(args, path)
+            with open(target + ".tmp", "wb") as f:
+                f.write(data)
+            os.replace(target + ".tmp", target)
+        finally:
+            encode_slots.release()
+            stats.add("encode", time.perf_counter() - start)
+
+    def feed(pool):
+        list(pool.map(decode, todo))
+        put(None)
+
+    @torch.no_grad()
+    def infer(batch):
+        start = time.perf_counter()
+        imgs = np.stack([img for _, img in batch])
+        img_LR = torch.from_numpy(imgs[:, :, :, [2, 1, 0]].transpose(0, 3, 1, 2)).float()
+        img_LR = img_LR.div_(255).to(device)
+        if args.tile and max(img_LR.shape[-2:]) > args.tile:
+            output = torch.cat([tiled_forward(model, img_LR[i:i + 1], args.tile, args.tile_overlap)
+                                for i in range(len(batch))])
+        else:
+            output = model(img_LR)
+        output = output.float().cpu().clamp_(0, 1).mul_(255).round_().byte().numpy()
+        output = output[:, [2, 1, 0]].transpose(0, 2, 3, 1)
+        stats.add("inference", time.perf_counter() - start, len(batch))
+        for (path, _), img in zip(batch, output):
+            encode_slots.acquire()
+            encodes.append((path, encode_pool.submit(encode, path, np.ascontiguousarray(img))))
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(args.decode_workers) as decode_pool, \
+            ThreadPoolExecutor(args.encode_workers) as encode_pool:
+        threading.Thread(target=feed, args=(decode_pool,), daemon=True).start()
+
+        try:
+            # Group same-size images; flush a bucket when it is full, or the
+            # biggest one when too many mixed sizes are waiting
+            buckets = defaultdict(list)
+            waiting = 0
+            while True:
+                item = decoded.get()
+                if item is None:
+                    break
+                shape = item[1].shape
+                buckets[shape].append(item)
+                waiting += 1
+                if len(buckets[shape]) >= args.batch_size:
+                    waiting -= len(buckets[shape])
+                    infer(buckets.pop(shape))
+                elif waiting >= args.batch_size:
+                    shape = max(buckets, key=lambda s: len(buckets[s]))
+                    waiting -= len(buckets[shape])
+                    infer(buckets.pop(shape))
+            for batch in buckets.values():
+                infer(batch)
+        except BaseException:
+            stop.set()
+            # Unblock decode workers waiting on a full queue
+            while True:
+                try:
+                    decoded.get_nowait()
+                except queue.Empty:
+                    break
+            raise
+
+    for path, future in encodes:
+        try:
+            future.result()
+        except (RuntimeError, OSError) as e:
+            failures.append(f"{path} ({e})")
+    stats.report(time.perf_counter() - wall_start)
+    for path in failures:
+        print(f"failed: {path}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="models/RRDB_ESRGAN_x4.pth")
+    parser.add_argument("--input", default="LR/*", help="glob of input images")
+    parser.add_argument("--output", default="results")
+    parser.add_argument("--suffix", default="_rlt")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="reprocess inputs whose output already exists")
+    parser.add_argument("--format", default="png", choices=["png", "webp", "jpeg", "jpg"])
+    parser.add_argument("--quality", type=int, default=95, help="JPEG/lossy WebP quality")
+    parser.add_argument("--png-compression", type=int, default=3, help="0 (fastest) .. 9")
+    parser.add_argument("--lossless", action="store_true", help="lossless WebP")
+    parser.add_argument("--max-size", type=int, default=None,
+                        help="downscale outputs so the longer side is at most this")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--precision", default="fp32", choices=["fp32", "bf16", "fp16"])
+    parser.add_argument("--channels-last", action="store_true")
+    parser.add_argument("--threads", type=int, default=0, help="torch intra-op threads")
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--tile", type=int, default=256, help="0 disables tiling")
+    parser.add_argument("--tile-overlap", type=int, default=16)
+    parser.add_argument("--decode-workers", type=int, default=2)
+    parser.add_argument("--encode-workers", type=int, default=2)
+    parser.add_argument("--prefetch", type=int, default=16,
+                        help="max decoded images waiting for inference")
+    args = parser.parse_args(argv)
+    if args.lossless and args.format != "webp":
+        parser.error("--lossless only applies to --format webp")
+    if not 1 <= args.quality <= 100:
+        parser.error("--quality must be between 1 and 100")
+    if not 0 <= args.png_compression <= 9:
+        parser.error("--png-compression must be between 0 and 9")
+    if args.max_size is not None and args.max_size < 1:
+        parser.error("--max-size must be positive")
+    return args
+
+
+if __name__ == "__main__":
+    main(parse_args())
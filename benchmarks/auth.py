@@ -0,0 +1,61 @@
+"""Per-request overhead of get_current_user with and without the principal cache.
+
+Uses a throwaway SQLite database, so it runs offline:
+
+    python -m benchmarks.auth --requests 5000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import timedelta
+
+
+async def measure(get_current_user, session_factory, token, requests):
+    start = time.perf_counter()
+    for _ in range(requests):
+        async with session_factory() as db:
+            await get_current_user(token=token, db=db)
+    return (time.perf_counter() - start) / requests
+
+
+async def compare(get_current_user, session_factory, token, requests, cache, ttl):
+    cache.ttl = 0
+    uncached = await measure(get_current_user, session_factory, token, requests)
+    cache.ttl = ttl or 60
+    cached = await measure(get_current_user, session_factory, token, requests)
+    return uncached, cached
+
+
+def main(args):
+    db_dir = tempfile.mkdtemp(prefix="authbench_")
+    os.environ.setdefault(
+        "DATABASE_URL", f"sqlite:///{os.path.join(db_dir, 'auth.db')}")
+
+    from app.database import AsyncSessionLocal, Base, SessionLocal, engine
+    from app.models.template import Template  # noqa: F401, registers the table
+    from app.models.user import User
+    from app.services.auth import (create_access_token, get_current_user,
+                                   principal_cache)
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.add(User(email="bench@example.com", hashed_password="x", full_name="Bench"))
+    db.commit()
+    db.close()
+    token = create_access_token({"sub": "bench@example.com"}, timedelta(minutes=30))
+
+    ttl = principal_cache.ttl
+    uncached, cached = asyncio.run(compare(get_current_user, AsyncSessionLocal, token,
+                                           args.requests, principal_cache, ttl))
+
+    print(f"{args.requests} calls against {os.environ['DATABASE_URL']}")
+    print(f"  uncached: {uncached * 1e6:8.1f} us/request (JWT decode + DB lookup + UserInDB)")
+    print(f"  cached:   {cached * 1e6:8.1f} us/request ({uncached / cached:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    main(parser.parse_args())
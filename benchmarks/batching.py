@@ -0,0 +1,66 @@
+"""Throughput of the MicroBatcher vs. serial batch-of-one inference on CPU.
+
+Run from the repository root:
+
+    python -m benchmarks.batching --size 64 --requests 32 --concurrency 1 2 4 8
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
+
+from RRDBNet_arch import RRDBNet
+from app.utils.batching import MicroBatcher
+
+
+async def measure(submit, img, requests: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await submit(img)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return requests / (time.perf_counter() - start)
+
+
+async def main(args):
+    torch.manual_seed(0)
+    model = RRDBNet(3, 3, 64, args.blocks, gc=32).eval()
+
+    @torch.no_grad()
+    def forward(batch):
+        return model(batch)
+
+    img = torch.rand(1, 3, args.size, args.size)
+    forward(img)  # warm-up
+
+    serial = ThreadPoolExecutor(max_workers=1)
+    loop = asyncio.get_running_loop()
+
+    async def unbatched(x):
+        return await loop.run_in_executor(serial, forward, x)
+
+    print(f"input {args.size}x{args.size}, {args.blocks} RRDB blocks, "
+          f"{args.requests} requests, {torch.get_num_threads()} torch threads")
+    print(f"{'concurrency':>11} {'batch-of-one img/s':>19} {'batched img/s':>14} {'speedup':>8}")
+    for concurrency in args.concurrency:
+        batcher = MicroBatcher(forward, max_batch_size=args.max_batch_size,
+                               max_wait_ms=args.max_wait_ms)
+        base = await measure(unbatched, img, args.requests, concurrency)
+        batched = await measure(batcher.submit, img, args.requests, concurrency)
+        print(f"{concurrency:>11} {base:>19.2f} {batched:>14.2f} {batched / base:>7.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=64)
+    parser.add_argument("--blocks", type=int, default=23)
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--max-batch-size", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,50 @@
+"""Helpers shared by the benchmark and model tooling scripts."""
+import glob
+import math
+
+import cv2
+import numpy as np
+import torch
+
+from app.utils import conversion
+
+
+def to_tensor(img: np.ndarray, device: torch.device = torch.device("cpu")) -> torch.Tensor:
+    """BGR uint8 HWC image -> RGB float 1xCxHxW tensor in [0, 1], as the service converts."""
+    return conversion.to_tensor(img, device)
+
+
+def to_uint8(output: torch.Tensor) -> np.ndarray:
+    """RGB float 1xCxHxW tensor -> BGR uint8 HWC image; `output` may be clamped in place."""
+    # fp32 first: bf16 cannot hold x * 255 exactly
+    return conversion.to_uint8(output.float())
+
+
+def psnr(a: np.ndarray, b: np.ndarray) -> float:
+    mse = np.mean((a.astype(np.float64) - b.astype(np.float64)) ** 2)
+    return math.inf if mse == 0 else 10 * math.log10(255.0 ** 2 / mse)
+
+
+def ssim(a: np.ndarray, b: np.ndarray) -> float:
+    """Mean SSIM over channels with the usual 11x11 Gaussian window."""
+    c1 = (0.01 * 255) ** 2
+    c2 = (0.03 * 255) ** 2
+    scores = []
+    for channel in range(a.shape[2]):
+        x = a[:, :, channel].astype(np.float64)
+        y = b[:, :, channel].astype(np.float64)
+        mu_x = cv2.GaussianBlur(x, (11, 11), 1.5)
+        mu_y = cv2.GaussianBlur(y, (11, 11), 1.5)
+        sigma_x = cv2.GaussianBlur(x * x, (11, 11), 1.5) - mu_x ** 2
+        sigma_y = cv2.GaussianBlur(y * y, (11, 11), 1.5) - mu_y ** 2
+        sigma_xy = cv2.GaussianBlur(x * y, (11, 11), 1.5) - mu_x * mu_y
+        ssim_map = ((2 * mu_x * mu_y + c1) * (2 * sigma_xy + c2)) / \
+            ((mu_x ** 2 + mu_y ** 2 + c1) * (sigma_x + sigma_y + c2))
+        scores.append(ssim_map.mean())
+    return float(np.mean(scores))
+
+
+def load_images(pattern: str):
+    """Read every image matching a glob as BGR uint8 arrays, sorted by path."""
+    paths = sorted(glob.glob(pattern))
+    return paths, [cv2.imread(p, cv2.IMREAD_COLOR) for p in paths]
@@ -0,0 +1,107 @@
+"""Time and peak memory of image <-> tensor conversion around the generator.
+
+Compares the previous float64/fancy-indexing path (legacy_* below) with
+app.utils.conversion, both with the channel swap done by the copy (RGB
+model) and with it folded into the conv weights (BGR model), the latter
+also writing into a reused output buffer. Each variant runs in a fresh
+process and reports how far its peak RSS rose above the live input and
+model-output tensors.
+
+    python -m benchmarks.conversion --size 1000 --repeat 5
+
+A random RRDBNet also checks that folding BGR into the weights gives the
+same image as swapping channels around an RGB model.
+"""
+import argparse
+import multiprocessing
+import resource
+import time
+
+import numpy as np
+import torch
+
+VARIANTS = ["old", "new rgb", "new bgr+buffer"]
+
+
+def legacy_to_tensor(img, device):
+    img = img * 1.0 / 255
+    img = torch.from_numpy(np.transpose(img[:, :, [2, 1, 0]], (2, 0, 1))).float()
+    return img.unsqueeze(0).to(device)
+
+
+def legacy_to_uint8(output):
+    output = output.data.squeeze().float().cpu().clamp_(0, 1).numpy()
+    output = np.transpose(output[[2, 1, 0], :, :], (1, 2, 0))
+    return (output * 255.0).round().astype(np.uint8)
+
+
+def peak_rss_mb():
+    # Linux reports KiB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_variant(name, size, repeat, result):
+    from app.utils.conversion import OutputBuffers, to_tensor, to_uint8
+
+    torch.set_num_threads(1)
+    device = torch.device("cpu")
+    rng = np.random.RandomState(0)
+    img = rng.randint(0, 256, (size, size, 3), dtype=np.uint8)
+    # Stand-in for the 4x model output, allocated before the baseline
+    outputs = [torch.rand(1, 3, size * 4, size * 4) for _ in range(repeat)]
+    buffers = OutputBuffers(1 << 40)
+    baseline = peak_rss_mb()
+
+    start = time.perf_counter()
+    for output in outputs:
+        if name == "old":
+            legacy_to_tensor(img, device)
+            legacy_to_uint8(output)
+        elif name == "new rgb":
+            to_tensor(img, device)
+            to_uint8(output)
+        else:
+            to_tensor(img, device, bgr=True)
+            with buffers.acquire(size * 4, size * 4) as out:
+                to_uint8(output, bgr=True, out=out)
+    elapsed = (time.perf_counter() - start) / repeat
+    result.put((name, elapsed, peak_rss_mb() - baseline))
+
+
+@torch.no_grad()
+def check_fold():
+    from app.utils.conversion import to_tensor, to_uint8
+    from app.utils.model_loader import InferenceModel, build_model
+
+    torch.manual_seed(0)
+    model = InferenceModel(build_model())
+    img = np.random.RandomState(1).randint(0, 256, (16, 16, 3), dtype=np.uint8)
+    reference = to_uint8(model(to_tensor(img, torch.device("cpu"))))
+    model.to_bgr()
+    folded = to_uint8(model(to_tensor(img, torch.device("cpu"), bgr=True)), bgr=True)
+    return int(np.abs(reference.astype(int) - folded.astype(int)).max())
+
+
+def main(args):
+    out_mp = (args.size * 4) ** 2 / 1e6
+    print(f"{args.size}x{args.size} input, {out_mp:.1f} MP output, "
+          f"float32 output tensor {out_mp * 12:.0f} MB")
+    print(f"{'variant':<15} {'ms/image':>9} {'peak RSS +MB':>13}")
+    context = multiprocessing.get_context("spawn")
+    result = context.Queue()
+    for name in VARIANTS:
+        process = context.Process(target=run_variant,
+                                  args=(name, args.size, args.repeat, result))
+        process.start()
+        name, elapsed, peak = result.get()
+        process.join()
+        print(f"{name:<15} {elapsed * 1000:>9.1f} {peak:>13.1f}")
+    print(f"max pixel difference, folded BGR vs RGB model: {check_fold()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=1000, help="input side in pixels")
+    parser.add_argument("--repeat", type=int, default=3)
+    main(parser.parse_args())
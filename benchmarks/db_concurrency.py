@@ -0,0 +1,89 @@
+"""Event-loop stalls and throughput of template listing, sync vs. async sessions.
+
+Runs N concurrent list queries from coroutines, once through the sync
+Session (blocking the loop, as `async def` routes did before) and once
+through the async engine, while a ticker coroutine records how late the
+event loop wakes up.
+
+    python -m benchmarks.db_concurrency --templates 2000 --concurrency 16
+
+Uses a throwaway SQLite file unless DATABASE_URL is set.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from benchmarks.login import ticker
+
+
+async def run(query, concurrency, requests):
+    stop = asyncio.Event()
+    lags = []
+    tick = asyncio.create_task(ticker(stop, lags, interval=0.005))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await query()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await tick
+    return requests / elapsed, max(lags, default=0.0)
+
+
+async def main(args):
+    from app.database import AsyncSessionLocal, Base, SessionLocal, dispose_async_engine, engine
+    from app.models.template import Template
+    from app.models.user import User
+    from app.services import template as template_service
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    if not db.query(Template).count():
+        user = User(email="dbbench@example.com", hashed_password="x")
+        db.add(user)
+        body = template_service.store_body(db, "{}")
+        db.flush()
+        db.add_all(Template(title=f"Template {i}", category="post", width=1080,
+                            height=1080, body_hash=body.hash, creator_id=user.id)
+                   for i in range(args.templates))
+        db.commit()
+    db.close()
+
+    async def sync_query():
+        session = SessionLocal()
+        try:
+            template_service.get_templates(session, category="post")
+        finally:
+            session.close()
+
+    async def async_query():
+        async with AsyncSessionLocal() as session:
+            await template_service.get_templates_async(session, category="post")
+
+    print(f"{args.templates} templates, {args.requests} list queries per run")
+    print(f"{'concurrency':>11} {'sync q/s':>9} {'sync max stall ms':>18} "
+          f"{'async q/s':>10} {'async max stall ms':>19}")
+    for concurrency in args.concurrency:
+        sync_rate, sync_lag = await run(sync_query, concurrency, args.requests)
+        async_rate, async_lag = await run(async_query, concurrency, args.requests)
+        print(f"{concurrency:>11} {sync_rate:>9.1f} {sync_lag * 1000:>18.1f} "
+              f"{async_rate:>10.1f} {async_lag * 1000:>19.1f}")
+    await dispose_async_engine()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--templates", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+    os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(
+        tempfile.mkdtemp(prefix="dbbench_"), "bench.db"))
+    asyncio.run(main(args))
@@ -0,0 +1,88 @@
+"""Encode time, size and fidelity of each output format on upscaled images.
+
+Every configuration is applied to the images in results/ (4x outputs of
+test.py / batch_upscale.py) through the same OutputOptions the API uses.
+With --max-size the images are downscaled first, as the API's max_size
+option does. PSNR is measured against the image that was encoded, so it
+shows only the encoder's loss (inf means lossless).
+
+    python -m benchmarks.encoders --images 'results/*' --repeat 3
+    python -m benchmarks.encoders --max-size 2048
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from app.utils.output_format import OutputOptions
+from benchmarks.common import load_images, psnr
+
+CONFIGS = [
+    OutputOptions("png", png_compression=0),
+    OutputOptions("png", png_compression=1),
+    OutputOptions("png", png_compression=3),
+    OutputOptions("png", png_compression=6),
+    OutputOptions("png", png_compression=9),
+    OutputOptions("webp", lossless=True),
+    OutputOptions("webp", quality=75),
+    OutputOptions("webp", quality=90),
+    OutputOptions("jpeg", quality=80),
+    OutputOptions("jpeg", quality=90),
+    OutputOptions("jpeg", quality=95),
+]
+
+
+def label(options: OutputOptions) -> str:
+    if options.format == "png":
+        return f"png level {options.resolved_png_compression()}"
+    if options.lossless:
+        return "webp lossless"
+    return f"{options.format} q{options.resolved_quality()}"
+
+
+def downscale(img, max_size):
+    height, width = img.shape[:2]
+    if not max_size or max(height, width) <= max_size:
+        return img
+    scale = max_size / max(height, width)
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+
+
+def main(args):
+    _, images = load_images(args.images)
+    if not images:
+        raise SystemExit(f"No images match {args.images}")
+    # Downscale up front so only the encoder itself is timed
+    images = [downscale(img, args.max_size) for img in images]
+    raw_bytes = sum(img.nbytes for img in images)
+    megapixels = sum(img.shape[0] * img.shape[1] for img in images) / 1e6
+    print(f"{len(images)} images, {megapixels:.1f} MP total"
+          + (f", downscaled to <= {args.max_size}px" if args.max_size else ""))
+    print(f"{'config':<16} {'ms/image':>9} {'MB/s in':>8} {'KB/image':>9} "
+          f"{'ratio':>6} {'mean PSNR':>10}")
+
+    for config in CONFIGS:
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            encoded = [config.encode(img) for img in images]
+            best = min(best, time.perf_counter() - start)
+
+        size = sum(len(data) for data in encoded)
+        scores = [psnr(img, cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR))
+                  for img, data in zip(images, encoded)]
+        print(f"{label(config):<16} {best / len(images) * 1000:>9.1f} "
+              f"{raw_bytes / best / 2**20:>8.1f} {size / len(images) / 1024:>9.1f} "
+              f"{raw_bytes / size:>6.1f} {np.mean(scores):>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", default="results/*")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-size", type=int, default=None,
+                        help="also apply this downscale before encoding")
+    main(parser.parse_args())
@@ -0,0 +1,194 @@
+"""HTTP load test for the FastAPI app with mixed login / template / enhance traffic.
+
+By default app.main:app is booted in-process against a throwaway SQLite file
+and driven through httpx's ASGI transport, so no network, Postgres or model
+checkpoint is needed (random generator weights are used when the checkpoint
+is missing). Pass --url to drive a running server instead.
+
+    python -m benchmarks.http_load --concurrency 16 --duration 30 \
+        --mix login=1 templates=6 template=2 enhance=1
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+
+import cv2
+import httpx
+import numpy as np
+
+BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, float("inf")]
+PASSWORD = "load-test-password"
+
+
+def configure_local_app(args):
+    """Point the app at a temporary SQLite database and import it."""
+    db_dir = tempfile.mkdtemp(prefix="loadtest_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(db_dir, 'loadtest.db')}"
+    if not args.cache:
+        os.environ["RESULT_CACHE_MEMORY_BYTES"] = "0"
+
+    from app.main import app
+    from app.utils import image_processing
+    registry = image_processing.registry
+    path = registry.variants[registry.default]
+    if not os.path.exists(path):
+        from app.utils.model_loader import InferenceModel, build_model
+        image_processing.set_model(InferenceModel(build_model()))
+        print(f"{path} not found, using random weights")
+    return app
+
+
+class RouteStats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, route, seconds, ok):
+        self.latencies[route].append(seconds * 1000)
+        if not ok:
+            self.errors[route] += 1
+
+    def report(self, wall):
+        for route in sorted(self.latencies):
+            values = sorted(self.latencies[route])
+            n = len(values)
+            pct = {q: values[min(int(q / 100 * n), n - 1)] for q in (50, 90, 99)}
+            print(f"\n{route}: {n} requests, {self.errors[route]} errors, "
+                  f"{n / wall:.1f} req/s, p50 {pct[50]:.1f}ms p90 {pct[90]:.1f}ms "
+                  f"p99 {pct[99]:.1f}ms max {values[-1]:.1f}ms")
+            counts = [0] * len(BUCKETS_MS)
+            for v in values:
+                counts[next(i for i, b in enumerate(BUCKETS_MS) if v <= b)] += 1
+            width = max(counts)
+            for bound, count in zip(BUCKETS_MS, counts):
+                if count:
+                    label = f"<= {bound:g}ms" if bound != float("inf") else "> 10000ms"
+                    print(f"  {label:>12} {count:>7} {'#' * max(1, count * 40 // width)}")
+
+
+async def seed(client, args):
+    """Create designer users and templates through the public API, return tokens."""
+    tokens = []
+    for _ in range(args.users):
+        email = f"load-{uuid.uuid4().hex[:12]}@example.com"
+        response = await client.post("/api/v1/users/", json={
+            "email": email, "password": PASSWORD,
+            "full_name": "Load Test", "role": "designer"})
+        response.raise_for_status()
+        response = await client.post("/api/v1/auth/login",
+                                     data={"username": email, "password": PASSWORD})
+        response.raise_for_status()
+        tokens.append((email, response.json()["access_token"]))
+
+    template_ids = []
+    for i in range(args.templates):
+        _, token = tokens[i % len(tokens)]
+        response = await client.post("/api/v1/templates/", headers=auth(token), json={
+            "title": f"Template {i}", "category": random.choice(["post", "story", "banner"]),
+            "width": random.choice([1080, 1920]), "height": random.choice([1080, 1920]),
+            "image": None, "json": '{"objects": []}' * random.randint(1, 50)})
+        response.raise_for_status()
+        template_ids.append(response.json()["id"])
+
+    # Fail fast rather than time a run where the read routes only error
+    (await client.get("/api/v1/templates/")).raise_for_status()
+    if template_ids:
+        (await client.get(f"/api/v1/templates/{template_ids[0]}",
+                          headers=auth(tokens[0][1]))).raise_for_status()
+    return tokens, template_ids
+
+
+def auth(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def drive(client, args, tokens, template_ids, stats):
+    routes, weights = zip(*args.mix.items())
+    img = (np.random.RandomState(0).rand(args.image_size, args.image_size, 3) * 255)
+    upload = cv2.imencode(".png", img.astype(np.uint8))[1].tobytes()
+    deadline = time.perf_counter() + args.duration
+
+    async def request(route):
+        email, token = random.choice(tokens)
+        if route == "login":
+            return await client.post("/api/v1/auth/login",
+                                     data={"username": email, "password": PASSWORD})
+        if route == "templates":
+            return await client.get("/api/v1/templates/")
+        if route == "template":
+            return await client.get(f"/api/v1/templates/{random.choice(template_ids)}",
+                                    headers=auth(token))
+        if route == "enhance":
+            return await client.post("/api/v1/images/enhance", headers=auth(token),
+                                     files={"file": ("upload.png", upload, "image/png")})
+        raise ValueError(f"Unknown route {route}")
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            route = random.choices(routes, weights)[0]
+            start = time.perf_counter()
+            try:
+                response = await request(route)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            stats.record(route, time.perf_counter() - start, ok)
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+
+
+async def main(args):
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+        await run(client, args)
+        return
+
+    app = configure_local_app(args)
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        client = httpx.AsyncClient(transport=transport, base_url="http://loadtest",
+                                   timeout=args.timeout)
+        await run(client, args)
+
+
+async def run(client, args):
+    async with client:
+        tokens, template_ids = await seed(client, args)
+        print(f"Seeded {len(tokens)} users and {len(template_ids)} templates; "
+              f"running {args.concurrency} clients for {args.duration}s")
+        stats = RouteStats()
+        start = time.perf_counter()
+        await drive(client, args, tokens, template_ids, stats)
+        stats.report(time.perf_counter() - start)
+
+
+def parse_mix(values):
+    mix = {}
+    for value in values:
+        route, weight = value.split("=")
+        mix[route] = float(weight)
+    return mix
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="drive a running server instead of booting in-process")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--templates", type=int, default=50)
+    parser.add_argument("--image-size", type=int, default=64)
+    parser.add_argument("--mix", nargs="+", default=["login=1", "templates=6",
+                                                     "template=2", "enhance=1"])
+    parser.add_argument("--cache", action="store_true",
+                        help="keep the enhanced-image result cache enabled")
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+    args.mix = parse_mix(args.mix)
+    asyncio.run(main(args))
@@ -0,0 +1,212 @@
+"""Repeatable inference benchmarks for RRDBNet and the enhance pipeline.
+
+Runs a matrix of input sizes x torch thread counts x batch sizes x precision
+modes, reporting p50/p95 latency, images/s, megapixels/s and peak RSS, and
+writes everything to JSON so runs from different commits can be compared:
+
+    python -m benchmarks.inference --output bench_new.json
+    python -m benchmarks.inference --compare bench_old.json bench_new.json
+
+Inputs larger than --tile are processed tiled, as in the service. When the
+checkpoint is missing a randomly initialized generator is used, which has
+the same cost as the trained one.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+
+import cv2
+import numpy as np
+import torch
+
+from app.utils.model_loader import InferenceModel, build_model, load_model
+from app.utils.tiling import tiled_forward
+
+MODES = {
+    "fp32": ("fp32", False),
+    "fp32-cl": ("fp32", True),
+    "bf16": ("bf16", False),
+    "bf16-cl": ("bf16", True),
+}
+
+
+def reset_peak_rss() -> None:
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(values, q):
+    values = sorted(values)
+    index = min(int(round(q / 100 * (len(values) - 1))), len(values) - 1)
+    return values[index]
+
+
+def get_model(args, precision, channels_last):
+    if os.path.exists(args.model):
+        return load_model(args.model, torch.device("cpu"), precision=precision,
+                          channels_last=channels_last)
+    torch.manual_seed(0)
+    model = build_model()
+    if channels_last:
+        model = model.to(memory_format=torch.channels_last)
+    return InferenceModel(model, precision, channels_last).eval()
+
+
+def measure(fn, repeat, warmup):
+    for _ in range(warmup):
+        fn()
+    reset_peak_rss()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings, peak_rss_mb()
+
+
+def summarize(timings, images, pixels):
+    mean = statistics.mean(timings)
+    return {
+        "p50_ms": percentile(timings, 50) * 1000,
+        "p95_ms": percentile(timings, 95) * 1000,
+        "images_per_s": images / mean,
+        "megapixels_per_s": images * pixels / 1e6 / mean,
+    }
+
+
+def bench_model(args, model, size, batch):
+    img = torch.rand(batch, 3, size, size)
+
+    @torch.no_grad()
+    def run():
+        if args.tile and size > args.tile:
+            return tiled_forward(model, img, args.tile, args.tile_overlap)
+        return model(img)
+
+    return measure(run, args.repeat, args.warmup)
+
+
+def bench_pipeline(args, model, size):
+    from app.utils import image_processing
+    image_processing.set_model(model)
+    image_processing.settings.ENHANCE_TILE_SIZE = args.tile
+    image_processing.settings.ENHANCE_TILE_OVERLAP = args.tile_overlap
+    img = (np.random.RandomState(0).rand(size, size, 3) * 255).astype(np.uint8)
+    data = cv2.imencode(".png", img)[1].tobytes()
+    return measure(lambda: image_processing.enhance_bytes(data), args.repeat, args.warmup)
+
+
+def run_matrix(args):
+    results = []
+    for mode in args.modes:
+        precision, channels_last = MODES[mode]
+        model = get_model(args, precision, channels_last)
+        for threads in args.threads:
+            torch.set_num_threads(threads)
+            for size in args.sizes:
+                for target in args.targets:
+                    batches = args.batches if target == "model" else [1]
+                    for batch in batches:
+                        if target == "model":
+                            timings, rss = bench_model(args, model, size, batch)
+                        else:
+                            timings, rss = bench_pipeline(args, model, size)
+                        row = {"target": target, "mode": mode, "threads": threads,
+                               "size": size, "batch": batch,
+                               "tiled": bool(args.tile and size > args.tile),
+                               "peak_rss_mb": rss}
+                        row.update(summarize(timings, batch, size * size))
+                        results.append(row)
+                        print(f"{target:>8} {mode:>8} t={threads:<3} {size:>5}px b={batch:<2} "
+                              f"p50 {row['p50_ms']:9.1f}ms p95 {row['p95_ms']:9.1f}ms "
+                              f"{row['images_per_s']:7.2f} img/s {row['megapixels_per_s']:7.3f} MP/s "
+                              f"RSS {rss:7.0f}MB")
+    return results
+
+
+def environment(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit": commit,
+        "torch": torch.__version__,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "random_weights": not os.path.exists(args.model),
+        "repeat": args.repeat,
+    }
+
+
+def row_key(row):
+    return (row["target"], row["mode"], row["threads"], row["size"], row["batch"])
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = {row_key(r): r for r in json.load(f)["results"]}
+    with open(new_path) as f:
+        new = json.load(f)["results"]
+    print(f"{'target':>8} {'mode':>8} {'threads':>7} {'size':>5} {'batch':>5} "
+          f"{'old p50':>9} {'new p50':>9} {'change':>8}")
+    for row in new:
+        before = old.get(row_key(row))
+        if before is None:
+            continue
+        change = (row["p50_ms"] / before["p50_ms"] - 1) * 100
+        print(f"{row['target']:>8} {row['mode']:>8} {row['threads']:>7} {row['size']:>5} "
+              f"{row['batch']:>5} {before['p50_ms']:>9.1f} {row['p50_ms']:>9.1f} {change:>+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="models/RRDB_ESRGAN_x4.pth")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[64, 128, 256, 512, 1024])
+    parser.add_argument("--threads", type=int, nargs="+", default=[torch.get_num_threads()])
+    parser.add_argument("--batches", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--modes", nargs="+", default=["fp32", "bf16"], choices=list(MODES))
+    parser.add_argument("--targets", nargs="+", default=["model", "pipeline"],
+                        choices=["model", "pipeline"])
+    parser.add_argument("--tile", type=int, default=256)
+    parser.add_argument("--tile-overlap", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--output", default="bench_inference.json")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    report = {"environment": environment(args), "results": run_matrix(args)}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved {len(report['results'])} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Login throughput and event-loop stalls with bcrypt inline vs. on the hasher pool.
+
+A ticker coroutine measures how late the event loop wakes up while N
+concurrent password verifications run; with bcrypt inline every check
+stalls the loop for the full hash time.
+
+    python -m benchmarks.login --concurrency 1 8 32 --logins 64
+"""
+import argparse
+import asyncio
+import time
+
+from app.config import settings
+from app.utils.security import password_hasher, pwd_context, verify_password
+
+
+async def ticker(stop: asyncio.Event, lags: list, interval: float = 0.01):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(loop.time() - expected, 0.0))
+
+
+async def run(verify, hashed, logins, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    stop = asyncio.Event()
+    lags = []
+    tick = asyncio.create_task(ticker(stop, lags))
+
+    async def one():
+        async with semaphore:
+            assert await verify("correct horse battery", hashed)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await tick
+    return logins / elapsed, max(lags, default=0.0)
+
+
+async def inline(password, hashed):
+    return verify_password(password, hashed)
+
+
+async def pooled(password, hashed):
+    valid, _ = await password_hasher.verify_and_update(password, hashed)
+    return valid
+
+
+async def main(args):
+    hashed = pwd_context.hash("correct horse battery")
+    print(f"bcrypt rounds {settings.BCRYPT_ROUNDS}, "
+          f"{password_hasher.workers} hasher workers")
+    print(f"{'concurrency':>11} {'inline login/s':>15} {'inline max stall ms':>20} "
+          f"{'pool login/s':>13} {'pool max stall ms':>18}")
+    for concurrency in args.concurrency:
+        password_hasher.max_queue = max(password_hasher.max_queue, concurrency)
+        inline_rate, inline_lag = await run(inline, hashed, args.logins, concurrency)
+        pool_rate, pool_lag = await run(pooled, hashed, args.logins, concurrency)
+        print(f"{concurrency:>11} {inline_rate:>15.1f} {inline_lag * 1000:>20.1f} "
+              f"{pool_rate:>13.1f} {pool_lag * 1000:>18.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--logins", type=int, default=32)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,95 @@
+"""Startup time and memory of N model-serving processes, private vs. mmapped weights.
+
+Each worker process loads the generator, runs one small forward pass and
+then waits until all workers are up, so resident memory is measured while
+they coexist. PSS (proportional set size) splits shared pages between the
+processes that map them, so its sum is the real physical footprint.
+
+    python -m benchmarks.model_memory --workers 4 --model app/models/RRDB_ESRGAN_x4.pth
+
+A randomly initialized checkpoint is used when --model does not exist.
+"""
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import torch
+
+from app.utils.model_loader import build_model, load_model
+
+
+def memory_kb():
+    """(RSS, PSS) of the current process in kB, from /proc (Linux only)."""
+    values = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                values[parts[0]] = int(parts[1])
+    return values.get("Rss:", 0), values.get("Pss:", 0)
+
+
+def worker(path, mmap, ready, release, results):
+    start = time.perf_counter()
+    model = load_model(path, torch.device("cpu"), mmap=mmap)
+    load_time = time.perf_counter() - start
+    with torch.no_grad():
+        model(torch.rand(1, 3, 32, 32))
+    ready.wait()
+    results.put((load_time,) + memory_kb())
+    release.wait()
+
+
+def run(path, mmap, workers):
+    ctx = multiprocessing.get_context("spawn")
+    ready = ctx.Barrier(workers)
+    release = ctx.Event()
+    results = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(path, mmap, ready, release, results))
+             for _ in range(workers)]
+    for p in procs:
+        p.start()
+    rows = [results.get() for _ in procs]
+    release.set()
+    for p in procs:
+        p.join()
+    return rows
+
+
+def import_time(module: str) -> float:
+    code = ("import time; t = time.perf_counter(); import {}; "
+            "print(time.perf_counter() - t)").format(module)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True,
+                         text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def main(args):
+    path = args.model
+    if not os.path.exists(path):
+        path = os.path.join(tempfile.mkdtemp(), "random_RRDB.pth")
+        torch.save(build_model().state_dict(), path)
+        print(f"{args.model} not found, using random weights")
+
+    print(f"import app.utils.image_processing: "
+          f"{import_time('app.utils.image_processing') * 1000:.0f} ms (model loads lazily)")
+    print(f"{args.workers} workers, checkpoint {os.path.getsize(path) / 2**20:.1f} MB")
+    print(f"{'weights':>8} {'mean load ms':>13} {'sum RSS MB':>11} {'sum PSS MB':>11}")
+    for mmap in (False, True):
+        rows = run(path, mmap, args.workers)
+        load_ms = sum(r[0] for r in rows) / len(rows) * 1000
+        rss = sum(r[1] for r in rows) / 1024
+        pss = sum(r[2] for r in rows) / 1024
+        print(f"{'mmap' if mmap else 'private':>8} {load_ms:>13.1f} {rss:>11.1f} {pss:>11.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="app/models/RRDB_ESRGAN_x4.pth")
+    parser.add_argument("--workers", type=int, default=4)
+    main(parser.parse_args())
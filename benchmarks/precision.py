@@ -0,0 +1,64 @@
+"""Accuracy and speed of each inference precision / memory format vs. fp32.
+
+Every mode is run over the LR/ images and its 8-bit output is compared with
+the fp32 NCHW output (PSNR, higher is closer; inf means bit-identical).
+
+    python -m benchmarks.precision --model models/RRDB_ESRGAN_x4.pth --images 'LR/*'
+"""
+import argparse
+import time
+
+import numpy as np
+import torch
+
+from app.utils.model_loader import load_model
+from benchmarks.common import load_images, psnr, to_tensor, to_uint8
+
+MODES = [
+    ("fp32", False),
+    ("fp32", True),
+    ("bf16", False),
+    ("bf16", True),
+]
+
+
+def main(args):
+    device = torch.device(args.device)
+    _, images = load_images(args.images)
+    images = [to_tensor(img, device) for img in images]
+    if not images:
+        raise SystemExit(f"No images match {args.images}")
+
+    reference = None
+    baseline_time = None
+    print(f"{len(images)} images, {torch.get_num_threads()} torch threads")
+    print(f"{'precision':>9} {'channels_last':>13} {'mean PSNR':>10} {'min PSNR':>9} "
+          f"{'seconds':>8} {'speedup':>8}")
+    for precision, channels_last in MODES:
+        model = load_model(args.model, device, precision=precision,
+                           channels_last=channels_last)
+        outputs = []
+        elapsed = 0.0
+        with torch.no_grad():
+            model(images[0])  # warm-up
+            for img in images:
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    output = model(img)
+                    elapsed += time.perf_counter() - start
+                outputs.append(to_uint8(output))
+
+        if reference is None:
+            reference, baseline_time = outputs, elapsed
+        scores = [psnr(ref, out) for ref, out in zip(reference, outputs)]
+        print(f"{precision:>9} {str(channels_last):>13} {np.mean(scores):>10.2f} "
+              f"{min(scores):>9.2f} {elapsed:>8.2f} {baseline_time / elapsed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default="models/RRDB_ESRGAN_x4.pth")
+    parser.add_argument("--images", default="LR/*")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--repeat", type=int, default=3)
+    main(parser.parse_args())
@@ -0,0 +1,125 @@
+"""Table size and read latency of template JSON: raw Text vs. deduplicated gzip.
+
+Seeds two SQLite files with the same synthetic canvases: one keeps the JSON
+in a plain Text column (the old schema), the other uses template_bodies.
+Reports file size, then times a single-template read for each way the
+bytes can reach the client:
+
+  raw        Text column, sent as is
+  raw+gzip   Text column, gzipped per response (a compression middleware)
+  stored     gzip column, decompressed for clients without gzip
+  pre-gz     gzip column, stored bytes sent with Content-Encoding: gzip
+
+    python -m benchmarks.template_storage --templates 5000 --unique 0.2
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import tempfile
+import time
+
+
+def canvas(rng, objects):
+    # Fabric.js-like canvas: many near-identical objects, like designer exports
+    return json.dumps({"version": "5.3.0", "background": "#ffffff", "objects": [
+        {"type": rng.choice(["textbox", "rect", "image", "circle"]),
+         "left": rng.randint(0, 1080), "top": rng.randint(0, 1080),
+         "width": rng.randint(10, 500), "height": rng.randint(10, 500),
+         "fill": rng.choice(["#000000", "#ff0000", "#1e88e5"]),
+         "stroke": None, "strokeWidth": 1, "scaleX": 1, "scaleY": 1, "angle": 0,
+         "opacity": 1, "shadow": None, "visible": True, "fontFamily": "Vazirmatn",
+         "text": "Lorem ipsum dolor sit amet"} for _ in range(objects)]})
+
+
+def timed(fn, ids):
+    start = time.perf_counter()
+    wire = 0
+    for template_id in ids:
+        wire += len(fn(template_id))
+    elapsed = time.perf_counter() - start
+    return elapsed / len(ids), wire / len(ids)
+
+
+def main(args):
+    from sqlalchemy import Column, Integer, MetaData, Table, Text, create_engine, select
+
+    from app.database import Base, SessionLocal, engine
+    from app.models.template import Template, TemplateBody
+    from app.models.user import User
+    from app.services import template as template_service
+
+    rng = random.Random(0)
+    unique = max(1, int(args.templates * args.unique))
+    bodies = [canvas(rng, args.objects) for _ in range(unique)]
+    texts = [bodies[i % unique] for i in range(args.templates)]
+
+    raw_path = os.path.join(tempfile.mkdtemp(prefix="storagebench_"), "raw.db")
+    raw_engine = create_engine("sqlite:///" + raw_path)
+    raw_table = Table("templates", MetaData(), Column("id", Integer, primary_key=True),
+                      Column("json", Text, nullable=False))
+    raw_table.metadata.create_all(raw_engine)
+    with raw_engine.begin() as conn:
+        conn.execute(raw_table.insert(), [{"id": i + 1, "json": t} for i, t in enumerate(texts)])
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user = User(email="storagebench@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    stored = {}
+    for i, text in enumerate(texts):
+        if text not in stored:
+            stored[text] = template_service.store_body(db, text)
+        db.add(Template(id=i + 1, title=f"Template {i}", category="post", width=1080,
+                        height=1080, body=stored[text], creator_id=user.id))
+    db.commit()
+
+    raw_size = os.path.getsize(raw_path)
+    stored_size = os.path.getsize(engine.url.database)
+    text_bytes = sum(len(t) for t in texts)
+    print(f"{args.templates} templates, {unique} distinct bodies, "
+          f"~{text_bytes / args.templates / 1024:.0f} KB json each")
+    print(f"raw Text table: {raw_size / 2**20:.1f} MiB, "
+          f"deduplicated gzip: {stored_size / 2**20:.1f} MiB "
+          f"({raw_size / stored_size:.1f}x smaller)")
+
+    conn = raw_engine.connect()
+
+    def raw_text(template_id):
+        return conn.execute(select(raw_table.c.json)
+                            .where(raw_table.c.id == template_id)).scalar_one().encode()
+
+    def stored_data(template_id):
+        return db.execute(select(TemplateBody.data).join(Template)
+                          .where(Template.id == template_id)).scalar_one()
+
+    readers = [
+        ("raw", raw_text),
+        ("raw+gzip", lambda i: gzip.compress(raw_text(i), compresslevel=6)),
+        ("stored", lambda i: gzip.decompress(stored_data(i))),
+        ("pre-gz", stored_data),
+    ]
+    ids = [rng.randint(1, args.templates) for _ in range(args.reads)]
+    print(f"{'read path':<10} {'ms/read':>8} {'KB on wire':>11}")
+    for name, fn in readers:
+        latency, wire = timed(fn, ids)
+        print(f"{name:<10} {latency * 1000:>8.3f} {wire / 1024:>11.1f}")
+    conn.close()
+    db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--templates", type=int, default=5000)
+    parser.add_argument("--unique", type=float, default=0.2,
+                        help="fraction of templates with a distinct body")
+    parser.add_argument("--objects", type=int, default=400,
+                        help="canvas objects per template (~0.4 KB each)")
+    parser.add_argument("--reads", type=int, default=2000)
+    args = parser.parse_args()
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(
+        tempfile.mkdtemp(prefix="storagebench_"), "bench.db")
+    main(args)
@@ -0,0 +1,91 @@
+"""Template listing cost: full table vs. keyset pages without the json column.
+
+Seeds a catalog of templates with realistic json payloads, then times the
+old `query.all()` listing (json included) against first and deep keyset
+pages, and reports the serialized response size of each.
+
+    python -m benchmarks.templates --templates 100000 --json-kb 8
+
+Uses a throwaway SQLite file unless DATABASE_URL is set.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(args):
+    from sqlalchemy.orm import joinedload
+
+    from app.database import Base, SessionLocal, engine
+    from app.models.template import Template
+    from app.models.user import User
+    from app.schemas.template import TemplateDetail, TemplateOut
+    from app.services import template as template_service
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    if not db.query(Template).count():
+        user = User(email="templatebench@example.com", hashed_password="x")
+        db.add(user)
+        body = template_service.store_body(
+            db, json.dumps({"objects": ["x" * 64] * (args.json_kb * 16)}))
+        db.flush()
+        categories = ["post", "story", "banner", "flyer"]
+        for start in range(0, args.templates, 10000):
+            db.bulk_insert_mappings(Template, [
+                dict(title=f"Template {i}", category=categories[i % len(categories)],
+                     width=1080, height=1080 if i % 2 else 1920, body_hash=body.hash,
+                     creator_id=user.id)
+                for i in range(start, min(start + 10000, args.templates))])
+        db.commit()
+
+    def full():
+        # What GET /templates/ did before: every row, json column included
+        rows = db.query(Template).options(joinedload(Template.body)) \
+            .filter(Template.category == "post").all()
+        return [TemplateDetail.model_validate(t).model_dump_json() for t in rows]
+
+    def page(after_id):
+        def run():
+            rows = template_service.get_templates(
+                db, category="post", after_id=after_id, limit=args.limit)
+            return [TemplateOut.model_validate(t).model_dump_json() for t in rows]
+        return run
+
+    deep_cursor = db.query(Template.id).filter(Template.category == "post") \
+        .order_by(Template.id).offset(args.templates // 8).limit(1).scalar()
+
+    print(f"{args.templates} templates, ~{args.json_kb} KB json each, page size {args.limit}")
+    print(f"{'listing':<14} {'rows':>7} {'best ms':>9} {'response KB':>12}")
+    for name, fn in [("full .all()", full), ("first page", page(None)),
+                     ("deep page", page(deep_cursor))]:
+        elapsed, body = timed(fn, args.repeat)
+        size = sum(len(item) for item in body) / 1024
+        print(f"{name:<14} {len(body):>7} {elapsed * 1000:>9.1f} {size:>12.1f}")
+        db.expunge_all()
+    db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--templates", type=int, default=100000)
+    parser.add_argument("--json-kb", type=int, default=8)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(
+        tempfile.mkdtemp(prefix="templatebench_"), "bench.db"))
+    main(args)
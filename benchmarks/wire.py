@@ -0,0 +1,140 @@
+"""Bytes on the wire and time to first byte for JSON and image responses.
+
+Boots app.main:app under uvicorn on a local port (so TTFB includes real
+socket writes), seeds templates with synthetic canvases, then fetches:
+
+  * the template list and detail with Accept-Encoding identity/gzip/br/zstd
+  * the pre-compressed /templates/{id}/json route
+  * /images/enhance with Accept image/png, image/webp and image/jpeg
+
+Codings whose library is not installed are skipped. Random generator
+weights are used when the checkpoint is missing.
+
+    python -m benchmarks.wire --image LR/baboon.png --repeat 5
+"""
+import argparse
+import os
+import random
+import socket
+import statistics
+import threading
+import time
+from types import SimpleNamespace
+
+import httpx
+
+from benchmarks.http_load import PASSWORD, auth, configure_local_app
+from benchmarks.template_storage import canvas
+
+
+def fetch(client, method, url, headers, **kwargs):
+    """Return (ttfb seconds, total seconds, bytes received before decoding)."""
+    start = time.perf_counter()
+    with client.stream(method, url, headers=headers, **kwargs) as response:
+        response.raise_for_status()
+        ttfb = None
+        size = 0
+        for chunk in response.iter_raw():
+            if ttfb is None:
+                ttfb = time.perf_counter() - start
+            size += len(chunk)
+    total = time.perf_counter() - start
+    return ttfb if ttfb is not None else total, total, size
+
+
+def report(name, samples):
+    ttfb = statistics.median(s[0] for s in samples) * 1000
+    total = statistics.median(s[1] for s in samples) * 1000
+    print(f"{name:<34} {samples[0][2] / 1024:>10.1f} {ttfb:>9.1f} {total:>9.1f}")
+
+
+def serve(app, port):
+    import uvicorn
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port,
+                                           log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def seed(client, args):
+    email = f"wire-{random.randrange(1 << 32):x}@example.com"
+    client.post("/api/v1/users/", json={
+        "email": email, "password": PASSWORD, "role": "designer"}).raise_for_status()
+    response = client.post("/api/v1/auth/login", data={"username": email, "password": PASSWORD})
+    response.raise_for_status()
+    token = response.json()["access_token"]
+
+    rng = random.Random(0)
+    template_ids = []
+    for i in range(args.templates):
+        response = client.post("/api/v1/templates/", headers=auth(token), json={
+            "title": f"Template {i}", "category": "post", "width": 1080, "height": 1080,
+            "image": None, "json": canvas(rng, args.objects)})
+        response.raise_for_status()
+        template_ids.append(response.json()["id"])
+    return token, template_ids
+
+
+def main(args):
+    from app.utils.content_coding import ENCODERS
+
+    if args.url:
+        base_url, server = args.url, None
+    else:
+        app = configure_local_app(SimpleNamespace(cache=False))
+        port = free_port()
+        server, thread = serve(app, port)
+        base_url = f"http://127.0.0.1:{port}"
+
+    client = httpx.Client(base_url=base_url, timeout=args.timeout)
+    token, template_ids = seed(client, args)
+    with open(args.image, "rb") as f:
+        upload = f.read()
+
+    codings = ["identity"] + [c for c in ("gzip", "br", "zstd") if c in ENCODERS]
+    print(f"{'response':<34} {'KB wire':>10} {'TTFB ms':>9} {'total ms':>9}")
+    for coding in codings:
+        headers = {"Accept-Encoding": coding}
+        report(f"template list (200) {coding}", [
+            fetch(client, "GET", "/api/v1/templates/?limit=200", headers)
+            for _ in range(args.repeat)])
+        report(f"template detail {coding}", [
+            fetch(client, "GET", f"/api/v1/templates/{template_ids[0]}",
+                  {**headers, **auth(token)}) for _ in range(args.repeat)])
+    for coding in ("identity", "gzip"):
+        report(f"template json route {coding}", [
+            fetch(client, "GET", f"/api/v1/templates/{template_ids[0]}/json",
+                  {"Accept-Encoding": coding, **auth(token)}) for _ in range(args.repeat)])
+
+    for accept in ("image/png", "image/webp", "image/jpeg"):
+        report(f"enhance {accept}", [
+            fetch(client, "POST", "/api/v1/images/enhance",
+                  {"Accept": accept, "Accept-Encoding": "identity", **auth(token)},
+                  files={"file": (os.path.basename(args.image), upload, "image/png")})
+            for _ in range(args.repeat)])
+
+    client.close()
+    if server is not None:
+        server.should_exit = True
+        thread.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="measure a running server instead of booting one")
+    parser.add_argument("--image", default="LR/baboon.png")
+    parser.add_argument("--templates", type=int, default=20)
+    parser.add_argument("--objects", type=int, default=400)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=300)
+    main(parser.parse_args())
@@ -0,0 +1,90 @@
+"""Static int8 post-training quantization of the RRDBNet generator.
+
+Calibrates activation ranges on a directory of LR images, converts the
+convolutions (almost all of them inside ResidualDenseBlock_5C) to int8 and
+saves a TorchScript artifact that app/utils/model_loader.load_model can serve
+(set MODEL_PATH to the .pt file). Dynamic quantization is not used because it
+only covers Linear/LSTM layers and this model is all Conv2d.
+
+    python quantize_RRDB_models.py --model models/RRDB_ESRGAN_x4.pth \
+        --images 'LR/*' --output models/RRDB_ESRGAN_x4_int8.pt
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import torch
+from torch.ao.quantization import get_default_qconfig_mapping
+from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+from app.utils.model_loader import build_model
+from benchmarks.common import load_images, psnr, ssim, to_tensor, to_uint8
+
+
+def crop(img: np.ndarray, size: int) -> np.ndarray:
+    if not size:
+        return img
+    h, w = img.shape[:2]
+    y0, x0 = max((h - size) // 2, 0), max((w - size) // 2, 0)
+    return img[y0:y0 + size, x0:x0 + size]
+
+
+def timed(model, inputs):
+    outputs = []
+    start = time.perf_counter()
+    with torch.no_grad():
+        for img in inputs:
+            outputs.append(to_uint8(model(img)))
+    return outputs, (time.perf_counter() - start) / len(inputs)
+
+
+def main(args):
+    engine = args.engine
+    if engine not in torch.backends.quantized.supported_engines:
+        raise SystemExit(f"Quantized engine {engine} is not available here")
+    torch.backends.quantized.engine = engine
+
+    _, images = load_images(args.images)
+    if not images:
+        raise SystemExit(f"No images match {args.images}")
+    inputs = [to_tensor(crop(img, args.crop)) for img in images]
+
+    model = build_model(torch.load(args.model, map_location="cpu"))
+
+    print(f"Calibrating on {len(inputs)} images ({engine})")
+    prepared = prepare_fx(model, get_default_qconfig_mapping(engine), (inputs[0],))
+    with torch.no_grad():
+        for img in inputs:
+            prepared(img)
+    quantized = torch.jit.trace(convert_fx(prepared), (inputs[0],))
+    quantized = torch.jit.freeze(quantized.eval())
+    torch.jit.save(quantized, args.output)
+    print("Saving to ", args.output)
+
+    # Report against the fp32 checkpoint
+    model(inputs[0])
+    quantized(inputs[0])
+    reference, fp32_latency = timed(model, inputs)
+    outputs, int8_latency = timed(quantized, inputs)
+
+    fp32_size = os.path.getsize(args.model)
+    int8_size = os.path.getsize(args.output)
+    print(f"size     {fp32_size / 2**20:8.1f} MB -> {int8_size / 2**20:8.1f} MB "
+          f"({fp32_size / int8_size:.2f}x smaller)")
+    print(f"latency  {fp32_latency * 1000:8.1f} ms -> {int8_latency * 1000:8.1f} ms "
+          f"({fp32_latency / int8_latency:.2f}x faster)")
+    print(f"PSNR vs fp32 {np.mean([psnr(a, b) for a, b in zip(reference, outputs)]):.2f} dB, "
+          f"SSIM vs fp32 {np.mean([ssim(a, b) for a, b in zip(reference, outputs)]):.4f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="models/RRDB_ESRGAN_x4.pth")
+    parser.add_argument("--images", default="LR/*")
+    parser.add_argument("--output", default="models/RRDB_ESRGAN_x4_int8.pt")
+    parser.add_argument("--crop", type=int, default=128,
+                        help="centre-crop calibration images to this size, 0 keeps full frames")
+    parser.add_argument("--engine", default="x86")
+    main(parser.parse_args())
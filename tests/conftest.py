@@ -0,0 +1,7 @@
+import os
+import tempfile
+
+# app.config reads DATABASE_URL at import time; never point tests at a real
+# database
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="tests_"),
+                                                         "test.db")
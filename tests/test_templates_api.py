@@ -0,0 +1,93 @@
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+pytest.importorskip("aiosqlite")
+pytest.importorskip("torch")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.database import SessionLocal  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.user import User, UserRole  # noqa: E402
+from app.schemas.template import TemplateCreate  # noqa: E402
+from app.services import template as template_service  # noqa: E402
+from app.services.auth import get_current_user  # noqa: E402
+from app.services.template import template_cache  # noqa: E402
+
+CANVAS = '{"objects": [' + ",".join(['{"type": "rect"}'] * 200) + "]}"
+
+
+@pytest.fixture(scope="module")
+def seeded():
+    """A running app with one template, as (client, template id)."""
+    app.dependency_overrides[get_current_user] = lambda: None
+    with TestClient(app) as client:
+        db = SessionLocal()
+        user = User(email="templates-test@example.com", hashed_password="x",
+                    role=UserRole.designer)
+        db.add(user)
+        db.commit()
+        template = template_service.create_template(db, TemplateCreate(
+            title="Poster", category="post", width=1080, height=1920,
+            image=None, json=CANVAS), user.id)
+        db.close()
+        yield client, template.id
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def client(seeded):
+    # Every test starts on a response cache miss
+    template_cache.clear()
+    return seeded[0]
+
+
+@pytest.fixture
+def template_id(seeded):
+    return seeded[1]
+
+
+def test_list_templates(client, template_id):
+    response = client.get("/api/v1/templates/")
+    assert response.status_code == 200
+    [item] = response.json()
+    assert item["id"] == template_id
+    assert item["title"] == "Poster"
+    assert "json" not in item
+
+
+def test_get_template(client, template_id):
+    response = client.get(f"/api/v1/templates/{template_id}")
+    assert response.status_code == 200
+    detail = response.json()
+    assert detail["id"] == template_id
+    assert detail["json"] == CANVAS
+
+
+@pytest.mark.parametrize("path", ["/api/v1/templates/", "/api/v1/templates/{id}"])
+@pytest.mark.parametrize("clear_cache", [False, True])
+def test_not_modified(client, template_id, path, clear_cache):
+    path = path.format(id=template_id)
+    etag = client.get(path).headers["etag"]
+    if clear_cache:
+        template_cache.clear()
+    response = client.get(path, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+
+@pytest.mark.parametrize("clear_cache", [False, True])
+def test_not_modified_matches_compressed_validators(client, template_id, clear_cache):
+    path = f"/api/v1/templates/{template_id}"
+    headers = {"Accept-Encoding": "gzip"}
+    response = client.get(path, headers=headers)
+    assert response.headers["content-encoding"] == "gzip"
+    etag = response.headers["etag"]
+    assert etag.startswith("W/")
+    if clear_cache:
+        template_cache.clear()
+    not_modified = client.get(path, headers={**headers, "If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == etag
+    assert "Accept-Encoding" in not_modified.headers["vary"]
@@ -0,0 +1,65 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from RRDBNet_arch import RRDBNet  # noqa: E402
+from app.utils.tiling import tile_boxes, tiled_forward  # noqa: E402
+
+# Largest allowed |tiled - full| on [0, 1] outputs, a bit over 1/255: the
+# linear ramps hide the tile borders but do not make the seams exact
+SEAM_TOLERANCE = 5e-3
+
+
+def covered(height, width, boxes):
+    mask = torch.zeros(height, width, dtype=torch.bool)
+    for y0, y1, x0, x1 in boxes:
+        mask[y0:y1, x0:x1] = True
+    return mask
+
+
+@pytest.mark.parametrize("height,width,tile_size,overlap", [
+    (64, 64, 32, 8),
+    (70, 45, 32, 8),   # last tile pinned to the border in both axes
+    (33, 100, 16, 15),
+    (20, 24, 32, 8),   # smaller than one tile
+    (32, 32, 32, 8),   # exactly one tile
+])
+def test_tile_boxes_cover_every_pixel(height, width, tile_size, overlap):
+    boxes = tile_boxes(height, width, tile_size, overlap)
+    assert covered(height, width, boxes).all()
+    for y0, y1, x0, x1 in boxes:
+        assert 0 <= y0 < y1 <= height and 0 <= x0 < x1 <= width
+        assert y1 - y0 <= tile_size and x1 - x0 <= tile_size
+    assert max(y1 for _, y1, _, _ in boxes) == height
+    assert max(x1 for _, _, _, x1 in boxes) == width
+
+
+def test_tile_boxes_single_tile_when_image_fits():
+    assert tile_boxes(20, 24, 32, 8) == [(0, 20, 0, 24)]
+
+
+def test_tile_boxes_pin_last_tile():
+    boxes = tile_boxes(70, 45, 32, 8)
+    assert sorted({y0 for y0, _, _, _ in boxes}) == [0, 24, 38]
+    assert sorted({x0 for _, _, x0, _ in boxes}) == [0, 13]
+
+
+@pytest.fixture(scope="module")
+def model():
+    torch.manual_seed(0)
+    return RRDBNet(3, 3, 16, 1, gc=8).eval()
+
+
+@torch.no_grad()
+def test_tiled_forward_matches_full_frame(model):
+    img = torch.rand(1, 3, 48, 56, generator=torch.Generator().manual_seed(1))
+    full = model(img)
+    tiled = tiled_forward(model, img, tile_size=32, overlap=16)
+    assert tiled.shape == full.shape
+    assert (tiled - full).abs().max().item() < SEAM_TOLERANCE
+
+
+@torch.no_grad()
+def test_tiled_forward_single_tile_is_exact(model):
+    img = torch.rand(1, 3, 20, 24, generator=torch.Generator().manual_seed(2))
+    torch.testing.assert_close(tiled_forward(model, img, tile_size=32), model(img))